@@ -1,32 +1,67 @@
+import os
+
 from flask import Flask, jsonify
 from flask_restful import Api
 from flask_jwt_extended import JWTManager
 
 from blocklist import BLOCKLIST
 from resources.user import UserRegister, User, UserList, UserLogin, TokenRefresh, UserLogout
-from resources.item import Item, ItemList
-from resources.store import Store, StoreList
-from resources.health import Health
-
-from db import db
+from resources.item import Item, ItemList, ItemLookup, ItemSearch, ItemBatch, ItemExport
+from resources.store import Store, StoreList, StoreStats, StoreStatsList
+from resources.health import Health, HealthReady
+from resources.cache import CacheStats
+from resources.changes import Changes
+from resources.metrics import Metrics
+
+from db import db, engine_options
+from models.store_stats import StoreStatsModel
+import migrations
+import query_stats
+from metrics import metrics
+from ratelimit import limiter
+from serialization import output_json
+import token_cache
 
 
 app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///data.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///data.db').replace('postgres://', 'postgresql://', 1)
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'],
+                                                         profile=os.environ.get('SQLITE_PROFILE', 'wal'))
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['PROPAGATE_EXCEPTIONS'] = True
 app.config['JWT_BLACKLIST_ENABLED'] = True
 app.config['JWT_BLACKLIST_TOKEN_CHECKS'] = ['access', 'refresh']
+app.config['SLOW_QUERY_THRESHOLD_MS'] = 100
+app.config['RATELIMIT_STORAGE'] = os.environ.get('RATELIMIT_STORAGE', 'memory')
+app.config['GROUP_COMMIT'] = os.environ.get('GROUP_COMMIT') == '1'
 app.secret_key = 'secret'
 api = Api(app)
+api.representation('application/json')(output_json)
+db.init_app(app)
+query_stats.init_app(app)
+metrics.init_app(app)
+limiter.init_app(app)
 
 
 @app.before_first_request
 def create_tables():
-    db.create_all()
+    migrations.upgrade(db.engine)
+
+
+@app.cli.command('migrate')
+def migrate_command():
+    """Upgrade the database schema to the latest version."""
+    print('Database at schema version {}'.format(migrations.upgrade(db.engine)))
+
+
+@app.cli.command('rebuild-store-stats')
+def rebuild_store_stats_command():
+    """Recompute the store_stats summaries from items, reporting any that had drifted."""
+    print('Rebuilt store stats, {} store(s) were out of date'.format(StoreStatsModel.rebuild()))
 
 
 jwt = JWTManager(app)
+token_cache.install()
 
 
 @jwt.user_claims_loader
@@ -43,6 +78,7 @@ def check_if_token_in_blocklist(decrypted_token):
 
 @jwt.expired_token_loader
 def expired_token_callback(error):
+    metrics.inc('jwt_errors_total', (('error', 'token_expired'),))
     return jsonify({
         'description': 'The token has expired.',
         'error': 'token_expired'
@@ -51,6 +87,7 @@ def expired_token_callback(error):
 
 @jwt.invalid_token_loader
 def invalid_token_callback(error):
+    metrics.inc('jwt_errors_total', (('error', 'invalid_token'),))
     return jsonify({
         'description': 'Signature verification failed.',
         'error': 'invalid_token'
@@ -59,6 +96,7 @@ def invalid_token_callback(error):
 
 @jwt.unauthorized_loader
 def unauthorized_callback(error):
+    metrics.inc('jwt_errors_total', (('error', 'authorization_required'),))
     return jsonify({
         'description': 'Request does not contain an access token.',
         'error': 'authorization_required'
@@ -67,6 +105,7 @@ def unauthorized_callback(error):
 
 @jwt.needs_fresh_token_loader
 def needs_fresh_token_callback():
+    metrics.inc('jwt_errors_total', (('error', 'fresh_token_required'),))
     return jsonify({
         'description': 'The supplied token is not fresh.',
         'error': 'fresh_token_required'
@@ -75,6 +114,7 @@ def needs_fresh_token_callback():
 
 @jwt.revoked_token_loader
 def revoked_token_callback():
+    metrics.inc('jwt_errors_total', (('error', 'token_revoked'),))
     return jsonify({
         'description': 'The supplied token has been revoked.',
         'error': 'token_revoked'
@@ -84,15 +124,24 @@ def revoked_token_callback():
 api.add_resource(Store, '/store/<string:name>')
 api.add_resource(Item, '/item/<string:name>')  # http://localhost:5000/item/chair
 api.add_resource(ItemList, '/items')
+api.add_resource(ItemLookup, '/items/lookup')
+api.add_resource(ItemSearch, '/items/search')
+api.add_resource(ItemBatch, '/items/batch')
+api.add_resource(ItemExport, '/items/export')
 api.add_resource(StoreList, '/stores')
+api.add_resource(StoreStats, '/store/<string:name>/stats')
+api.add_resource(StoreStatsList, '/stores/stats')
 api.add_resource(UserRegister, '/register')
 api.add_resource(User, '/user/<int:user_id>')
 api.add_resource(UserList, '/users')
-api.add_resource(Health, '/health')
+api.add_resource(Health, '/health', '/health/live')
+api.add_resource(HealthReady, '/health/ready')
+api.add_resource(CacheStats, '/cache/stats')
+api.add_resource(Changes, '/changes')
+api.add_resource(Metrics, '/metrics')
 api.add_resource(UserLogin, '/login')
 api.add_resource(UserLogout, '/logout')
 api.add_resource(TokenRefresh, '/refresh')
 
 if __name__ == '__main__':
-    db.init_app(app)
     app.run(port=5000, debug=True)
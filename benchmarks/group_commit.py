@@ -0,0 +1,58 @@
+"""
+Concurrent write throughput with one commit per request versus GROUP_COMMIT.
+
+Each of --threads threads POSTs --writes new stores through its own test client. The rate limiter
+and slow query log are switched off so that only the write path is measured.
+
+    python -m benchmarks.group_commit --threads 16 --writes 200
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from app import app
+from db import db
+import migrations
+
+
+def run(threads, writes, prefix):
+    def worker(t):
+        client = app.test_client()
+        for i in range(writes):
+            client.post('/store/{}-{}-{}'.format(prefix, t, i))
+
+    pool = [threading.Thread(target=worker, args=(t,)) for t in range(threads)]
+    start = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return threads * writes / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--writes', type=int, default=200, help='writes per thread')
+    parser.add_argument('--window-ms', type=float, default=2)
+    args = parser.parse_args()
+
+    app.config['RATELIMIT_ENABLED'] = False
+    app.config['SLOW_QUERY_THRESHOLD_MS'] = float('inf')  # lock waits under contention would flood the slow log
+    app.config['GROUP_COMMIT_WINDOW_MS'] = args.window_ms
+    with tempfile.TemporaryDirectory() as db_dir:
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(db_dir, 'bench.db')
+        with app.app_context():
+            migrations.upgrade(db.engine)
+            for mode in (False, True):
+                app.config['GROUP_COMMIT'] = mode
+                rate = run(args.threads, args.writes, 'group' if mode else 'direct')
+                print('{:<13} {:9.1f} writes/s'.format('group commit' if mode else 'direct', rate))
+            db.session.remove()
+            db.engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+Encode a large /stores-shaped catalog with the stdlib encoder and with orjson.
+
+    python -m benchmarks.json_encoders --stores 1000 --items-per-store 100
+"""
+import argparse
+import json
+import time
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def catalog(stores, items_per_store):
+    return {'stores': [
+        {'id': s + 1, 'name': 'store{}'.format(s), 'items': [
+            {'id': s * items_per_store + i + 1, 'name': 'item{}-{}'.format(s, i),
+             'price': round(1 + (s * items_per_store + i) % 1000 / 7.0, 2), 'store_id': s + 1}
+            for i in range(items_per_store)
+        ]}
+        for s in range(stores)
+    ]}
+
+
+def best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--stores', type=int, default=1000)
+    parser.add_argument('--items-per-store', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    data = catalog(args.stores, args.items_per_store)
+    stdlib = best_of(lambda: json.dumps(data) + '\n', args.repeat)
+    print('stdlib json: {:8.2f} ms'.format(stdlib * 1000))
+
+    if orjson is None:
+        print('orjson is not installed')
+        return
+    assert json.loads(orjson.dumps(data)) == data
+    fast = best_of(lambda: orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE),
+                   args.repeat)
+    print('orjson:      {:8.2f} ms  ({:.1f}x faster)'.format(fast * 1000, stdlib / fast))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,243 @@
+"""
+In-process load benchmark for every route registered with api.add_resource.
+
+Seeds a temporary database with --stores x --items-per-store items and --users users, drives the
+app through Flask's test client and writes p50/p95/p99 latency and throughput per route to a JSON
+file. Pass --compare with an earlier results file to fail when a route's p95 regresses. A route
+that answers anything but 2xx is flagged and the run exits non-zero, since its timings are not the
+ones being measured.
+
+    python -m benchmarks.load --stores 100 --items-per-store 50 --users 1000 --output bench_results.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime
+
+from flask_jwt_extended import create_access_token, create_refresh_token
+
+from app import api, app
+from db import db
+import migrations
+from changes import change_feed
+from models.item import ItemModel
+from models.store import StoreModel
+from models.user import UserModel
+
+BATCH_SIZE = 50
+LOOKUP_SIZE = 50
+
+
+def percentile(sorted_values, pct):
+    # Nearest-rank percentile
+    index = max(0, int(round(pct / 100.0 * len(sorted_values))) - 1)
+    return sorted_values[index]
+
+
+def seed(stores, items_per_store, users):
+    db.session.execute(StoreModel.__table__.insert(), [{'name': 'store{}'.format(s)} for s in range(stores)])
+    db.session.execute(ItemModel.__table__.insert(), [
+        {'name': 'item{}-{}'.format(s, i), 'price': round(1 + (s * items_per_store + i) % 1000 / 7.0, 2),
+         'store_id': s + 1}
+        for s in range(stores) for i in range(items_per_store)
+    ])
+    db.session.execute(UserModel.__table__.insert(), [
+        {'username': 'user{}'.format(u), 'password': 'pw{}'.format(u)} for u in range(max(users, 1))
+    ])
+    db.session.commit()
+
+
+def scenarios(args):
+    """
+    (resource, method, label, request factory) for each route, in the order they run.
+    A factory takes the iteration number and returns (path, request kwargs); it runs outside the timed section.
+    """
+    admin = {'Authorization': 'Bearer {}'.format(create_access_token(identity=1, fresh=True))}
+    refresh = {'Authorization': 'Bearer {}'.format(create_refresh_token(identity=1))}
+
+    def store_name(i):
+        return 'store{}'.format(i % args.stores)
+
+    def item_name(i):
+        return 'item{}-{}'.format(i % args.stores, i % args.items_per_store)
+
+    def logout_token(i):
+        return {'Authorization': 'Bearer {}'.format(create_access_token(identity=1))}
+
+    def bench_user_id(i):
+        return UserModel.find_by_username('bench-user{}'.format(i)).id
+
+    return [
+        ('Health', 'GET', None, lambda i: ('/health', {})),
+        ('HealthReady', 'GET', None, lambda i: ('/health/ready', {})),
+        ('CacheStats', 'GET', None, lambda i: ('/cache/stats', {})),
+        ('Metrics', 'GET', None, lambda i: ('/metrics', {})),
+        ('Changes', 'GET', 'catch up', lambda i: ('/changes?follow=false&last_event_id={}'.format(
+            max(0, change_feed.seq - 50)), {'headers': admin})),
+        ('Store', 'GET', None, lambda i: ('/store/' + store_name(i), {})),
+        ('Store', 'POST', None, lambda i: ('/store/bench-store{}'.format(i), {})),
+        ('Store', 'DELETE', None, lambda i: ('/store/bench-store{}'.format(i), {})),
+        ('StoreList', 'GET', None, lambda i: ('/stores', {})),
+        ('StoreStats', 'GET', None, lambda i: ('/store/{}/stats'.format(store_name(i)), {})),
+        ('StoreStatsList', 'GET', None, lambda i: ('/stores/stats', {})),
+        ('Item', 'GET', None, lambda i: ('/item/' + item_name(i), {'headers': admin})),
+        ('Item', 'POST', None, lambda i: ('/item/bench-item{}'.format(i), {'json': {'price': 1.5, 'store_id': 1}})),
+        ('Item', 'PUT', None, lambda i: ('/item/' + item_name(i), {'json': {'price': 2.5, 'store_id': 1}})),
+        ('Item', 'DELETE', None, lambda i: ('/item/bench-item{}'.format(i), {'headers': admin})),
+        ('ItemList', 'GET', 'anonymous', lambda i: ('/items', {})),
+        ('ItemList', 'GET', 'logged in', lambda i: ('/items', {'headers': admin})),
+        ('ItemList', 'GET', 'by names', lambda i: ('/items?names=' + ','.join(
+            item_name(i * LOOKUP_SIZE + n) for n in range(LOOKUP_SIZE)), {'headers': admin})),
+        ('ItemLookup', 'POST', None, lambda i: ('/items/lookup', {'headers': admin, 'json': {'names': [
+            item_name(i * LOOKUP_SIZE + n) for n in range(LOOKUP_SIZE)] + ['missing-item']}})),
+        ('ItemSearch', 'GET', 'prefix', lambda i: ('/items/search?q=item{}'.format(i % args.stores),
+                                                    {'headers': admin})),
+        ('ItemSearch', 'GET', 'price range', lambda i: ('/items/search?min_price={}&max_price={}'.format(
+            i % 100, i % 100 + 5), {'headers': admin})),
+        # names must be unique within a batch; after the first one every entry is an update
+        ('ItemBatch', 'POST', None, lambda i: ('/items/batch', {'json': [
+            {'name': 'bench-batch{}'.format(b), 'price': 3.5 + i % 2, 'store_id': 1} for b in range(BATCH_SIZE)
+        ]})),
+        ('ItemExport', 'GET', None, lambda i: ('/items/export', {'headers': admin})),
+        ('UserRegister', 'POST', None, lambda i: ('/register', {'json': {'username': 'bench-user{}'.format(i),
+                                                                         'password': 'pw'}})),
+        ('User', 'GET', None, lambda i: ('/user/{}'.format(i % max(args.users, 1) + 1), {})),
+        ('User', 'PUT', None, lambda i: ('/user/{}'.format(i % max(args.users, 1) + 1),
+                                         {'json': {'username': 'user{}'.format(i % max(args.users, 1)),
+                                                   'password': 'pw{}'.format(i % max(args.users, 1))}})),
+        ('User', 'DELETE', None, lambda i: ('/user/{}'.format(bench_user_id(i)), {'headers': admin})),
+        ('UserList', 'GET', None, lambda i: ('/users', {})),
+        ('UserLogin', 'POST', None, lambda i: ('/login', {'json': {'username': 'user{}'.format(i % max(args.users, 1)),
+                                                                    'password': 'pw{}'.format(i % max(args.users, 1))}})),
+        ('TokenRefresh', 'POST', None, lambda i: ('/refresh', {'headers': refresh})),
+        ('UserLogout', 'POST', None, lambda i: ('/logout', {'headers': logout_token(i)})),
+    ]
+
+
+def registered_routes():
+    routes = set()
+    for rule in app.url_map.iter_rules():
+        view_class = getattr(app.view_functions[rule.endpoint], 'view_class', None)
+        if view_class is None or rule.endpoint not in api.endpoints:
+            continue
+        for method in rule.methods - {'HEAD', 'OPTIONS'}:
+            routes.add((view_class.__name__, method, rule.rule))
+    return routes
+
+
+def run(args):
+    client = app.test_client()
+    plan = scenarios(args)
+
+    covered = {(resource, method) for resource, method, _, _ in plan}
+    missing = sorted('{} {}'.format(method, resource) for resource, method, _ in registered_routes()
+                     if (resource, method) not in covered)
+    if missing:
+        raise SystemExit('No benchmark scenario for: {}'.format(', '.join(missing)))
+
+    rules = {(resource, method): rule for resource, method, rule in registered_routes()}
+    results = {}
+    for resource, method, label, factory in plan:
+        for i in range(args.warmup):
+            path, kwargs = factory(args.requests + i)
+            client.open(path, method=method, **kwargs)
+
+        timings = []
+        statuses = Counter()
+        started = time.perf_counter()
+        for i in range(args.requests):
+            path, kwargs = factory(i)
+            start = time.perf_counter()
+            response = client.open(path, method=method, **kwargs)
+            response.get_data()
+            timings.append(time.perf_counter() - start)
+            statuses[response.status_code] += 1
+        elapsed = time.perf_counter() - started
+
+        timings.sort()
+        name = '{} {}'.format(method, rules[(resource, method)]) + (' ({})'.format(label) if label else '')
+        results[name] = {
+            'resource': resource,
+            'requests': len(timings),
+            'p50_ms': round(percentile(timings, 50) * 1000, 3),
+            'p95_ms': round(percentile(timings, 95) * 1000, 3),
+            'p99_ms': round(percentile(timings, 99) * 1000, 3),
+            'mean_ms': round(sum(timings) / len(timings) * 1000, 3),
+            'throughput_rps': round(len(timings) / elapsed, 1),
+            'statuses': {str(code): count for code, count in sorted(statuses.items())},
+            'errors': sum(count for code, count in statuses.items() if not 200 <= code < 300),
+        }
+        print('{:<45} p50 {:>8.3f}ms  p95 {:>8.3f}ms  p99 {:>8.3f}ms  {:>9.1f} req/s{}'.format(
+            name, results[name]['p50_ms'], results[name]['p95_ms'], results[name]['p99_ms'],
+            results[name]['throughput_rps'],
+            '  ERRORS {}'.format(results[name]['statuses']) if results[name]['errors'] else ''))
+    return results
+
+
+def compare(results, baseline_path, tolerance):
+    with open(baseline_path) as f:
+        baseline = json.load(f)['routes']
+
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before and result['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+            regressions.append('{}: p95 {:.3f}ms -> {:.3f}ms'.format(name, before['p95_ms'], result['p95_ms']))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--stores', type=int, default=20)
+    parser.add_argument('--items-per-store', type=int, default=50)
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--requests', type=int, default=200, help='timed requests per route')
+    parser.add_argument('--warmup', type=int, default=10, help='untimed requests per route')
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--compare', help='earlier results file to check for p95 regressions')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed p95 slowdown, as a fraction')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as db_dir:
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(db_dir, 'bench.db')
+        app.config['RATELIMIT_ENABLED'] = False  # measure the handlers, not the limiter
+        with app.app_context():
+            migrations.upgrade(db.engine)
+            seed(args.stores, args.items_per_store, args.users)
+            results = run(args)
+            db.session.remove()
+            db.engine.dispose()
+
+    report = {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat() + 'Z',
+            'python': platform.python_version(),
+            'stores': args.stores,
+            'items_per_store': args.items_per_store,
+            'users': args.users,
+            'requests_per_route': args.requests,
+        },
+        'routes': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print('Results written to {}'.format(args.output))
+
+    failed = sorted(name for name, result in results.items() if result['errors'])
+    for name in failed:
+        print('ERRORS {}: {}'.format(name, results[name]['statuses']))
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        for regression in regressions:
+            print('REGRESSION ' + regression)
+        failed += regressions
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""
+Write-path body validation with reqparse versus the precompiled schema.Schema.
+
+Each case parses the same request body with both and checks they agree. The request context is
+entered once per iteration outside the timed call, so only the parsing itself is measured.
+
+    python -m benchmarks.request_validation --iterations 20000
+"""
+import argparse
+import time
+
+from flask_restful import reqparse
+
+from app import app
+from schema import Schema
+
+FIELDS = (
+    ('price', float, "This field cannot be empty"),
+    ('store_id', int, "Store ID cannot be empty"),
+)
+
+
+def build_parser():
+    parser = reqparse.RequestParser()
+    for name, type_, help_message in FIELDS:
+        parser.add_argument(name, type=type_, required=True, help=help_message)
+    return parser
+
+
+def timed(parse, kwargs, iterations):
+    total = 0.0
+    result = None
+    for _ in range(iterations):
+        with app.test_request_context('/item/chair', method='PUT', **kwargs):
+            start = time.perf_counter()
+            result = dict(parse())
+            total += time.perf_counter() - start
+    return total, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=20000)
+    args = parser.parse_args()
+
+    request_parser = build_parser()
+    schema = Schema(*FIELDS)
+    cases = [
+        ('json', {'json': {'price': 12.5, 'store_id': 3}}),
+        ('form', {'data': {'price': '12.5', 'store_id': '3'}}),
+    ]
+    for name, kwargs in cases:
+        reqparse_time, reqparse_result = timed(request_parser.parse_args, kwargs, args.iterations)
+        schema_time, schema_result = timed(schema.parse, kwargs, args.iterations)
+        assert reqparse_result == schema_result, name
+        print('{:<5} reqparse {:7.2f} us   schema {:7.2f} us   {:.1f}x faster'.format(
+            name, reqparse_time / args.iterations * 1e6, schema_time / args.iterations * 1e6,
+            reqparse_time / schema_time))
+
+
+if __name__ == '__main__':
+    main()
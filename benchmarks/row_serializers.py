@@ -0,0 +1,70 @@
+"""
+List serialization through ORM instances and .json() versus Core rows turned straight into dicts.
+
+    python -m benchmarks.row_serializers --rows 100000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from app import app
+from db import db
+import migrations
+from models.item import ItemModel
+from models.store import StoreModel
+from models.user import UserModel
+
+
+def best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        db.session.expunge_all()
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    stores = max(args.rows // 100, 1)
+    with tempfile.TemporaryDirectory() as db_dir:
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(db_dir, 'bench.db')
+        with app.app_context():
+            migrations.upgrade(db.engine)
+            db.session.execute(StoreModel.__table__.insert(), [{'name': 'store{}'.format(s)} for s in range(stores)])
+            db.session.execute(ItemModel.__table__.insert(), [
+                {'name': 'item{}'.format(i), 'price': round(i % 1000 / 7.0, 2), 'store_id': i % stores + 1}
+                for i in range(args.rows)
+            ])
+            db.session.execute(UserModel.__table__.insert(), [
+                {'username': 'user{}'.format(i), 'password': 'pw'} for i in range(args.rows)
+            ])
+            db.session.commit()
+
+            cases = [
+                ('items', lambda: [item.json() for item in ItemModel.find_page(None, args.rows)[0]],
+                 lambda: ItemModel.find_page_json(None, args.rows)[0]),
+                ('users', lambda: [user.json() for user in UserModel.find_page(None, args.rows)[0]],
+                 lambda: UserModel.find_page_json(None, args.rows)[0]),
+                ('stores', lambda: [store.json() for store in StoreModel.find_page(None, stores)[0]],
+                 lambda: StoreModel.find_page_json(None, stores)[0]),
+            ]
+            for name, orm, core in cases:
+                orm_time, orm_result = best_of(orm, args.repeat)
+                core_time, core_result = best_of(core, args.repeat)
+                assert orm_result == core_result, name
+                print('{:<7} ORM {:9.1f} ms   Core {:9.1f} ms   {:.1f}x faster'.format(
+                    name, orm_time * 1000, core_time * 1000, orm_time / core_time))
+
+            db.session.remove()
+            db.engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
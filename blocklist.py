@@ -1 +1,62 @@
-BLOCKLIST = set()
\ No newline at end of file
+import threading
+import time
+
+from models.revoked_token import RevokedTokenModel
+from token_cache import token_cache
+
+SYNC_INTERVAL = 1.0  # seconds a worker may lag behind revocations made by other workers
+
+
+class Blocklist:
+    """
+    Revoked token ids, persisted in the revoked_tokens table so every worker and restart sees them.
+
+    Each process keeps the unexpired revocations in memory and pulls new rows at most once per
+    sync_interval (see RevokedTokenModel.find_since), so a lookup is normally a dict hit with no
+    database access.
+    Entries are dropped, locally and on disk, once the token's own exp has passed.
+    """
+
+    def __init__(self, sync_interval=SYNC_INTERVAL):
+        self.sync_interval = sync_interval
+        self._revoked = {}  # jti -> exp
+        self._last_id = 0
+        self._next_sync = 0
+        self._lock = threading.Lock()
+
+    def add(self, jti, expires_at):
+        RevokedTokenModel(jti, expires_at).save_to_db()
+        RevokedTokenModel.delete_expired(int(time.time()))  # logouts are rare enough to pay for the cleanup
+        with self._lock:
+            self._revoked[jti] = expires_at
+        token_cache.revoke(jti)
+
+    def __contains__(self, jti):
+        self.sync()
+        return jti in self._revoked
+
+    def __len__(self):
+        return len(self._revoked)
+
+    def sync(self, force=False):
+        now = time.time()
+        if not force and now < self._next_sync:
+            return
+
+        with self._lock:
+            if not force and now < self._next_sync:
+                return
+            for token in RevokedTokenModel.find_since(self._last_id, int(now)):
+                self._revoked[token.jti] = token.expires_at
+                self._last_id = max(self._last_id, token.id)
+            self._revoked = {jti: exp for jti, exp in self._revoked.items() if exp is None or exp >= now}
+            self._next_sync = now + self.sync_interval
+
+    def clear(self):
+        with self._lock:
+            self._revoked = {}
+            self._last_id = 0
+            self._next_sync = 0
+
+
+BLOCKLIST = Blocklist()
@@ -0,0 +1,144 @@
+"""
+Change feed for items and stores, served as server-sent events by resources.changes.
+
+The model write paths record one event per row created, updated or deleted with publish_on_commit,
+which numbers it inside the write transaction, after its last statement. Writers hold the database
+write lock (or, elsewhere, the catalog version row lock) at that point, so sequence numbers follow
+commit order; the event is published once the transaction commits and its number given up if it
+rolls back. Subscribers see events strictly in sequence order. Each event is encoded once, into a
+bounded ring buffer that every subscriber reads from; a condition variable wakes all the waiting streams at once, so
+fan-out costs no database queries and no per-client copies. A client that reconnects with
+Last-Event-ID gets what it missed if it is still in the buffer, or a reset event telling it to
+reload the full lists if it is not.
+
+Sequence numbers and the buffer are per process: run a single worker for /changes, or point
+subscribers at every worker.
+"""
+import json
+import threading
+from collections import deque
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+DEFAULT_CAPACITY = 10000
+DEFAULT_HEARTBEAT_SECONDS = 15.0
+RETRY_MS = 3000
+
+
+def format_event(seq, event, data):
+    return 'id: {}\nevent: {}\ndata: {}\n\n'.format(seq, event, json.dumps(data))
+
+
+class ChangeFeed:
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.seq = 0  # the last sequence number released to subscribers
+        self._reserved = 0
+        self._pending = {}  # seq -> encoded event, or None if cancelled, waiting for an earlier seq
+        # encoded events (None for cancelled numbers), sequence numbers self.seq - len + 1 .. self.seq
+        self._events = deque(maxlen=capacity)
+        self._condition = threading.Condition()
+
+    def reserve(self, count=1):
+        """Set aside the next count sequence numbers and return the first."""
+        with self._condition:
+            first = self._reserved + 1
+            self._reserved += count
+            return first
+
+    def publish(self, kind, action, data, seq=None):
+        """
+        Record e.g. ('item', 'updated', item.json()) as event seq, by default the next number. It reaches
+        subscribers once every earlier reserved number has been published or cancelled.
+        """
+        if seq is None:
+            seq = self.reserve()
+        encoded = format_event(seq, '{}.{}'.format(kind, action), data)
+        with self._condition:
+            self._pending[seq] = encoded
+            self._release()
+
+    def cancel(self, seq):
+        """Give up a reserved number whose write rolled back, so later events are not held back."""
+        with self._condition:
+            self._pending[seq] = None
+            self._release()
+
+    def _release(self):
+        released = False
+        while self.seq + 1 in self._pending:
+            self.seq += 1
+            self._events.append(self._pending.pop(self.seq))
+            released = True
+        if released:
+            self._condition.notify_all()
+
+    def wait(self, last_id, timeout):
+        """
+        Block until there are events after last_id or timeout passes.
+        Returns (encoded events, new last_id); the events are a single reset event when last_id is unknown.
+        """
+        with self._condition:
+            if last_id == self.seq:
+                self._condition.wait(timeout)
+
+            first = self.seq - len(self._events) + 1
+            if last_id > self.seq or last_id < first - 1:
+                reset = format_event(self.seq, 'reset', {
+                    'message': 'Events after {} are no longer available, reload /items and /stores'.format(last_id)
+                })
+                return [reset], self.seq
+            # index from the right: a subscriber that is keeping up only wants the last few entries
+            events = (self._events[-i] for i in range(self.seq - last_id, 0, -1))
+            return [encoded for encoded in events if encoded is not None], self.seq
+
+    def stream(self, last_id=None, heartbeat=DEFAULT_HEARTBEAT_SECONDS, follow=True):
+        """
+        SSE text for every event after last_id (or from now on), with a comment line when nothing happens.
+        With follow=False it stops once it has caught up, for clients that would rather poll.
+        """
+        if last_id is None:
+            last_id = self.seq
+        yield 'retry: {}\n\n'.format(RETRY_MS)
+        while True:
+            events, last_id = self.wait(last_id, heartbeat if follow else 0)
+            yield from events
+            if not follow:
+                return
+            if not events:
+                yield ': keep-alive\n\n'  # also how a closed connection is noticed
+
+    def clear(self):
+        with self._condition:
+            self.seq = self._reserved = 0
+            self._pending.clear()
+            self._events.clear()
+
+
+change_feed = ChangeFeed()
+
+
+def publish_on_commit(session, *events):
+    """
+    Number (kind, action, data) events for the write in session's transaction. Call it last in the
+    write, after any statement that could fail; the events are published when the transaction commits.
+    """
+    session.flush()
+    seq = change_feed.reserve(len(events))
+    session.info.setdefault('change_events', []).extend((seq + i, event) for i, event in enumerate(events))
+
+
+@event.listens_for(Session, 'after_commit')
+def publish_committed(session):
+    if session.get_nested_transaction() is not None:
+        return  # a savepoint (one group commit unit) was released, the write is not committed yet
+    for seq, (kind, action, data) in session.info.pop('change_events', []):
+        change_feed.publish(kind, action, data, seq)
+
+
+@event.listens_for(Session, 'after_transaction_end')
+def cancel_uncommitted(session, transaction):
+    if transaction.parent is None:
+        for seq, _ in session.info.pop('change_events', []):
+            change_feed.cancel(seq)
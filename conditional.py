@@ -0,0 +1,31 @@
+import hashlib
+
+from flask import Response, request
+from werkzeug.http import quote_etag
+
+from cache import response_cache
+from models.version import CATALOG, VersionModel
+
+
+def cached_get(key, load):
+    """
+    Serve a catalog GET with a strong ETag, a 304 on If-None-Match and the response cache.
+
+    The ETag and the cache key both include the catalog version, which every item and store write
+    bumps in its own transaction, so an unchanged resource is answered without calling load() and a
+    write made by any worker process is never hidden behind a stale 304 or cache entry.
+    load() returns (body, cache tags), or None if there is nothing to serve.
+    """
+    version = VersionModel.current(CATALOG)
+    etag = '{}-{}'.format(version, hashlib.sha1(repr(key).encode()).hexdigest()[:16])
+    if request.if_none_match.contains(etag):
+        return Response(status=304, headers={'ETag': quote_etag(etag)})
+
+    response = response_cache.get((version,) + key)
+    if response is None:
+        loaded = load()
+        if loaded is None:
+            return None
+        response, tags = loaded
+        response_cache.set((version,) + key, response, tags=tags)
+    return response, 200, {'ETag': quote_etag(etag)}
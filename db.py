@@ -1,3 +1,62 @@
+from functools import partial
+
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+# Applied to every new SQLite connection. WAL lets readers carry on while a writer commits,
+# busy_timeout makes a blocked writer wait instead of failing with "database is locked".
+SQLITE_PROFILES = {
+    'wal': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,  # ms
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64 * 1024,  # negative means KiB, i.e. 64 MiB per connection
+    },
+    'default': {},
+}
+
+
+def engine_options(uri, profile='wal', pool_size=10, max_overflow=20):
+    """
+    SQLALCHEMY_ENGINE_OPTIONS for uri. File-backed SQLite gets a pool of reusable connections
+    (so the pragmas are paid once per connection, not per request) plus the named pragma profile;
+    any other database just gets a pool sized for multi-threaded workers.
+    """
+    if uri.startswith('sqlite'):
+        if uri in ('sqlite://', 'sqlite:///:memory:'):
+            return {}
+        return {
+            'poolclass': QueuePool,
+            'pool_size': pool_size,
+            'max_overflow': max_overflow,
+            'connect_args': {'check_same_thread': False},
+            'sqlite_pragmas': SQLITE_PROFILES[profile],
+        }
+    return {
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'pool_pre_ping': True,
+        'pool_recycle': 1800,
+    }
+
+
+def set_sqlite_pragmas(pragmas, dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for pragma, value in pragmas.items():
+        cursor.execute('PRAGMA {} = {}'.format(pragma, value))
+    cursor.close()
+
+
+class Database(SQLAlchemy):
+
+    def create_engine(self, sa_url, engine_opts):
+        pragmas = engine_opts.pop('sqlite_pragmas', None)
+        engine = super().create_engine(sa_url, engine_opts)
+        if pragmas:
+            event.listen(engine, 'connect', partial(set_sqlite_pragmas, pragmas))
+        return engine
+
 
-db = SQLAlchemy()
+db = Database()
@@ -0,0 +1,38 @@
+from flask_restful import abort, reqparse
+from sqlalchemy import select
+
+fields_parser = reqparse.RequestParser()
+fields_parser.add_argument('fields',
+                           type=str,
+                           location='args',
+                           help="Fields must be a comma separated list"
+                           )
+
+
+def fields_arg(available):
+    """
+    ?fields=name,price as a tuple in the order of available, so responses keep the key order of json().
+    Every field when the parameter is absent or names none (?fields=, ?fields=%20); 400 on a name that is
+    not in available.
+    """
+    raw = fields_parser.parse_args()['fields'] or ''
+    requested = {field.strip() for field in raw.split(',') if field.strip()}
+    if not requested:
+        return available
+
+    unknown = sorted(requested - set(available))
+    if unknown:
+        abort(400, message="Unknown field(s) {}, choose from {}".format(', '.join(unknown), ', '.join(available)))
+    return tuple(field for field in available if field in requested)
+
+
+def select_fields(model, fields):
+    # Only the requested columns are read, plus the primary key that keyset pagination orders on
+    columns = [getattr(model, field) for field in fields]
+    if 'id' not in fields:
+        columns.append(model.id)
+    return select(*columns)
+
+
+def rows_json(fields, rows):
+    return [dict(zip(fields, row)) for row in rows]  # zip stops before any trailing id added by select_fields
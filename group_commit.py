@@ -0,0 +1,143 @@
+"""
+Optional group commit for model writes.
+
+Every model write goes through write(unit, *instances), where unit() does the session work and
+returns the method's result. By default that is unit() followed by db.session.commit(), as before.
+
+With GROUP_COMMIT on, the request thread hands unit to a single committer thread and waits on a
+future. The committer collects whatever units arrive within GROUP_COMMIT_WINDOW_MS (at most
+GROUP_COMMIT_MAX_BATCH of them), runs each inside its own SAVEPOINT so a failing unit rolls back
+alone, and commits the lot in one transaction, paying for one fsync instead of one per request. A
+request only gets its result, or its unit's exception, once that commit has finished. A request
+that waits longer than GROUP_COMMIT_TIMEOUT seconds gets a TimeoutError; its unit is skipped if the
+committer has not started it yet.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+
+from flask import current_app
+from sqlalchemy import inspect, text
+
+from db import db
+from metrics import metrics
+
+DEFAULT_WINDOW_MS = 2
+DEFAULT_MAX_BATCH = 64
+DEFAULT_TIMEOUT = 30  # seconds
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+class GroupCommitter:
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, unit):
+        """Queue unit for the next group commit and return a Future for its result."""
+        if self._thread is None or not self._thread.is_alive():
+            self._start(current_app._get_current_object())
+        future = Future()
+        self._queue.put((unit, future))
+        return future
+
+    def _start(self, app):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, args=(app,), name='group-commit', daemon=True)
+                self._thread.start()
+
+    def _run(self, app):
+        while True:
+            batch = [self._queue.get()]
+            try:
+                window = app.config.get('GROUP_COMMIT_WINDOW_MS', DEFAULT_WINDOW_MS) / 1000
+                max_batch = app.config.get('GROUP_COMMIT_MAX_BATCH', DEFAULT_MAX_BATCH)
+                deadline = time.monotonic() + window
+                while len(batch) < max_batch:
+                    try:
+                        batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                    except queue.Empty:
+                        break
+                with app.app_context():
+                    self._commit(batch)
+            except Exception as e:
+                # e.g. no app context or session: fail this batch rather than the thread, and every later write
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    @staticmethod
+    def _commit(batch):
+        batch = [(unit, future) for unit, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return  # every caller has timed out
+        session = db.session()
+        session.expire_on_commit = False  # callers read the written instances after they come back detached
+        outcomes = []
+        try:
+            if session.get_bind().dialect.name == 'sqlite':
+                session.execute(text('BEGIN IMMEDIATE'))  # one outer transaction, or RELEASE would commit each unit
+            for unit, future in batch:
+                try:
+                    with session.begin_nested():
+                        result = unit()
+                    outcomes.append((future, result, None))  # after the with, whose exit flushes the unit
+                except Exception as e:
+                    outcomes.append((future, None, e))
+            session.commit()
+            metrics.inc('write_commits_total', (('mode', 'group'),))
+        except Exception as e:
+            session.rollback()
+            outcomes = [(future, None, e) for future, _, _ in outcomes] + \
+                [(future, None, e) for _, future in batch[len(outcomes):]]
+        finally:
+            session.expunge_all()
+
+        metrics.observe('write_batch_size', len(batch))
+        for future, result, error in outcomes:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+
+committer = GroupCommitter()
+
+
+def write(unit, *instances):
+    """
+    Run unit() and commit it, returning unit's result. instances are the ORM objects unit adds or
+    deletes; in group commit mode they move to the committer's session for the write and come back
+    attached to this thread's session afterwards (unless deleted), so lazy loads keep working.
+    """
+    if not current_app.config.get('GROUP_COMMIT', False):
+        result = unit()
+        db.session.commit()
+        metrics.inc('write_commits_total', (('mode', 'direct'),))
+        return result
+
+    for instance in instances:
+        if inspect(instance).session is not None:
+            db.session.expunge(instance)
+    db.session.rollback()  # end this thread's read transaction, so its snapshot is not older than the write
+
+    future = committer.submit(unit)
+    try:
+        result = future.result(timeout=current_app.config.get('GROUP_COMMIT_TIMEOUT', DEFAULT_TIMEOUT))
+    except TimeoutError:
+        future.cancel()  # only succeeds if the unit has not started, one that is running may still commit
+        raise
+
+    for instance in instances:
+        state = inspect(instance)
+        if not state.was_deleted and state.key not in db.session.identity_map:
+            db.session.add(instance)
+    return result
+
+
+metrics.counter('write_commits_total', 'Transactions committed by model writes, by mode (direct or group).')
+metrics.histogram('write_batch_size', 'Model writes combined into each group commit.', BATCH_BUCKETS)
@@ -0,0 +1,206 @@
+"""
+Prometheus metrics with per-thread aggregation.
+
+Each thread records into its own shard of plain dicts, so the request hot path takes no locks;
+a scrape of /metrics merges the shards. Shards of threads that have exited are folded into one
+retired shard, so a thread-per-request server does not accumulate them. Gauges that are cheap to
+read at scrape time (pool usage, cache statistics) come from collector functions instead of being
+recorded per request.
+"""
+import threading
+import time
+import weakref
+from bisect import bisect_left
+
+from flask import current_app, g, request
+
+from cache import response_cache
+from db import db
+from token_cache import token_cache
+
+REQUEST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class _Shard:
+    def __init__(self):
+        self.counters = {}  # (name, labels) -> value
+        self.histograms = {}  # (name, labels) -> [count per bucket..., +Inf count, sum]
+
+    def add(self, other):
+        for key, value in dict(other.counters).items():
+            self.counters[key] = self.counters.get(key, 0) + value
+        for key, values in dict(other.histograms).items():
+            merged = self.histograms.setdefault(key, [0] * len(values))
+            for i, value in enumerate(list(values)):
+                merged[i] += value
+
+
+class Metrics:
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards = []  # (weak reference to the recording thread, its shard)
+        self._retired = _Shard()  # totals from threads that have exited
+        self._lock = threading.Lock()
+        self._meta = {}  # name -> (type, help, buckets)
+        self._collectors = []
+
+    def counter(self, name, help_text):
+        self._meta[name] = ('counter', help_text, None)
+
+    def histogram(self, name, help_text, buckets):
+        self._meta[name] = ('histogram', help_text, tuple(buckets))
+
+    def collector(self, func):
+        """Register func() -> [(name, type, help, [(labels, value), ...]), ...], called on every scrape."""
+        self._collectors.append(func)
+        return func
+
+    def inc(self, name, labels=(), amount=1):
+        counters = self._shard().counters
+        key = (name, labels)
+        counters[key] = counters.get(key, 0) + amount
+
+    def observe(self, name, value, labels=()):
+        histograms = self._shard().histograms
+        key = (name, labels)
+        buckets = self._meta[name][2]
+        values = histograms.get(key)
+        if values is None:
+            values = histograms[key] = [0] * (len(buckets) + 1) + [0.0]
+        values[bisect_left(buckets, value)] += 1
+        values[-1] += value
+
+    def _shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = _Shard()
+            with self._lock:
+                self._retire_exited()
+                self._shards.append((weakref.ref(threading.current_thread()), shard))
+            return shard
+
+    def _retire_exited(self):
+        # an exited thread writes no more, so its shard can be folded in without racing it
+        live = []
+        for ref, shard in self._shards:
+            thread = ref()
+            if thread is not None and thread.is_alive():
+                live.append((ref, shard))
+            else:
+                self._retired.add(shard)
+        self._shards = live
+
+    def snapshot(self):
+        """Sum every thread's shard into {(name, labels): value} and {(name, labels): [buckets..., sum]}."""
+        total = _Shard()
+        with self._lock:
+            self._retire_exited()
+            total.add(self._retired)
+            for _, shard in self._shards:
+                total.add(shard)
+        return total.counters, total.histograms
+
+    def render(self):
+        counters, histograms = self.snapshot()
+        lines = []
+
+        for name, (type_, help_text, buckets) in sorted(self._meta.items()):
+            lines.append('# HELP {} {}'.format(name, help_text))
+            lines.append('# TYPE {} {}'.format(name, type_))
+            if type_ == 'counter':
+                for (metric, labels), value in sorted(counters.items()):
+                    if metric == name:
+                        lines.append('{}{} {}'.format(name, format_labels(labels), value))
+                continue
+
+            for (metric, labels), values in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(buckets + ('+Inf',), values):
+                    cumulative += count
+                    lines.append('{}_bucket{} {}'.format(name, format_labels(labels + (('le', str(bound)),)),
+                                                         cumulative))
+                lines.append('{}_sum{} {}'.format(name, format_labels(labels), values[-1]))
+                lines.append('{}_count{} {}'.format(name, format_labels(labels), cumulative))
+
+        for collect in self._collectors:
+            for name, type_, help_text, samples in collect():
+                lines.append('# HELP {} {}'.format(name, help_text))
+                lines.append('# TYPE {} {}'.format(name, type_))
+                for labels, value in samples:
+                    lines.append('{}{} {}'.format(name, format_labels(labels), value))
+
+        return '\n'.join(lines) + '\n'
+
+    def start_request(self):
+        g.metrics_start = time.perf_counter()
+
+    def finish_request(self, response):
+        start = g.pop('metrics_start', None)
+        if start is None:
+            return response
+
+        view = current_app.view_functions.get(request.endpoint)
+        resource = getattr(view, 'view_class', view).__name__ if view else 'none'
+        labels = (('resource', resource), ('method', request.method), ('status', str(response.status_code)))
+        self.inc('http_requests_total', labels)
+        self.observe('http_request_duration_seconds', time.perf_counter() - start, labels)
+        return response
+
+    def init_app(self, app):
+        app.before_request(self.start_request)
+        app.after_request(self.finish_request)
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join('{}="{}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"')
+                                           .replace('\n', '\\n'))
+                          for key, value in labels) + '}'
+
+
+metrics = Metrics()
+metrics.counter('http_requests_total', 'Requests handled, by resource class, method and status code.')
+metrics.histogram('http_request_duration_seconds', 'Request latency, by resource class, method and status code.',
+                  REQUEST_BUCKETS)
+metrics.counter('jwt_errors_total', 'Requests rejected by a JWT error callback, by error.')
+
+
+@metrics.collector
+def collect_pool():
+    pool = db.engine.pool
+    samples = []
+    for name, attribute, help_text in (
+            ('db_pool_size', 'size', 'Connections the pool keeps open.'),
+            ('db_pool_checked_out', 'checkedout', 'Connections currently in use.'),
+            ('db_pool_overflow', 'overflow', 'Connections open beyond pool_size.')):
+        if hasattr(pool, attribute):
+            samples.append((name, 'gauge', help_text, [((), getattr(pool, attribute)())]))
+    return samples
+
+
+@metrics.collector
+def collect_cache():
+    stats = response_cache.stats()
+    return [
+        ('response_cache_hits_total', 'counter', 'Response cache hits.', [((), stats['hits'])]),
+        ('response_cache_misses_total', 'counter', 'Response cache misses.', [((), stats['misses'])]),
+        ('response_cache_evictions_total', 'counter', 'Entries evicted to stay under max_bytes.',
+         [((), stats['evictions'])]),
+        ('response_cache_entries', 'gauge', 'Entries currently cached.', [((), stats['entries'])]),
+        ('response_cache_bytes', 'gauge', 'Approximate size of cached responses.', [((), stats['bytes'])]),
+    ]
+
+
+@metrics.collector
+def collect_token_cache():
+    return [
+        ('jwt_cache_hits_total', 'counter', 'Requests whose token was already verified.', [((), token_cache.hits)]),
+        ('jwt_cache_misses_total', 'counter', 'Requests whose token signature was verified.',
+         [((), token_cache.misses)]),
+        ('jwt_cache_entries', 'gauge', 'Verified tokens currently cached.', [((), len(token_cache))]),
+    ]
@@ -0,0 +1,53 @@
+"""
+Versioned schema migrations.
+
+Each migration module exposes VERSION, a docstring describing the change and upgrade(connection).
+upgrade() applies every migration newer than the version recorded in schema_version, one
+transaction per migration, so an existing data.db is brought up to date in place.
+"""
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, select
+
+from migrations import m0001_initial, m0002_lookup_indexes, m0003_revoked_tokens, \
+    m0004_resource_versions, m0005_item_search, m0006_store_stats
+
+MIGRATIONS = [
+    m0001_initial,
+    m0002_lookup_indexes,
+    m0003_revoked_tokens,
+    m0004_resource_versions,
+    m0005_item_search,
+    m0006_store_stats,
+]
+
+metadata = MetaData()
+schema_version = Table('schema_version', metadata,
+                       Column('version', Integer, primary_key=True),
+                       Column('description', String(200)),
+                       Column('applied_at', DateTime))
+
+
+def current_version(connection):
+    return connection.execute(select(func.max(schema_version.c.version))).scalar() or 0
+
+
+def upgrade(engine):
+    """Apply any outstanding migrations and return the resulting schema version."""
+    with engine.begin() as connection:
+        schema_version.create(connection, checkfirst=True)
+        version = current_version(connection)
+
+    for migration in MIGRATIONS:
+        if migration.VERSION <= version:
+            continue
+        with engine.begin() as connection:
+            migration.upgrade(connection)
+            connection.execute(schema_version.insert().values(
+                version=migration.VERSION,
+                description=migration.__doc__.strip().splitlines()[0],
+                applied_at=datetime.utcnow()
+            ))
+        version = migration.VERSION
+
+    return version
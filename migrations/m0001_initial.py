@@ -0,0 +1,27 @@
+"""
+Baseline items, stores and users tables, as previously created by db.create_all().
+"""
+from sqlalchemy import Column, Float, ForeignKey, Integer, MetaData, String, Table
+
+VERSION = 1
+
+metadata = MetaData()
+
+Table('stores', metadata,
+      Column('id', Integer, primary_key=True),
+      Column('name', String(80)))
+
+Table('items', metadata,
+      Column('id', Integer, primary_key=True),
+      Column('name', String(80)),
+      Column('price', Float(precision=2)),
+      Column('store_id', Integer, ForeignKey('stores.id')))
+
+Table('users', metadata,
+      Column('id', Integer, primary_key=True),
+      Column('username', String(80)),
+      Column('password', String(80)))
+
+
+def upgrade(connection):
+    metadata.create_all(connection, checkfirst=True)  # existing databases already have these tables
@@ -0,0 +1,61 @@
+"""
+Unique indexes on items.name, stores.name and users.username, plus an index on items.store_id.
+
+Duplicate store names left over from before the unique indexes are merged into the lowest id,
+the row .first() lookups already returned: their items are moved to it and the empty copies
+removed. Duplicate item names or usernames carry data (prices, passwords, the user ids inside
+live tokens), so the migration stops and lists them instead, to be renamed or removed by hand.
+"""
+from sqlalchemy import Index, MetaData, Table, text
+
+VERSION = 2
+
+UNIQUE_COLUMNS = [
+    ('items', 'name'),
+    ('stores', 'name'),
+    ('users', 'username'),
+]
+MERGED_TABLES = {'stores'}
+
+MERGE_STORES = [
+    'UPDATE items SET store_id = (SELECT MIN(keep.id) FROM stores AS keep JOIN stores AS dup '
+    'ON keep.name = dup.name WHERE dup.id = items.store_id) '
+    'WHERE store_id IN (SELECT id FROM stores WHERE name IS NOT NULL AND id NOT IN '
+    '(SELECT MIN(id) FROM stores WHERE name IS NOT NULL GROUP BY name))',
+    'DELETE FROM stores WHERE name IS NOT NULL AND id NOT IN '
+    '(SELECT MIN(id) FROM stores WHERE name IS NOT NULL GROUP BY name)',
+]
+
+
+def duplicates(connection, table_name, column):
+    """[(value, [ids])] for every value of column held by more than one row."""
+    rows = connection.execute(text(
+        'SELECT {column}, id FROM {table} WHERE {column} IN '
+        '(SELECT {column} FROM {table} GROUP BY {column} HAVING COUNT(*) > 1) ORDER BY {column}, id'.format(
+            table=table_name, column=column)
+    ))
+    found = {}
+    for value, _id in rows:
+        found.setdefault(value, []).append(_id)
+    return list(found.items())
+
+
+def upgrade(connection):
+    metadata = MetaData()
+
+    for statement in MERGE_STORES:
+        connection.execute(text(statement))
+
+    for table_name, column in UNIQUE_COLUMNS:
+        found = [] if table_name in MERGED_TABLES else duplicates(connection, table_name, column)
+        if found:
+            raise RuntimeError('Cannot add a unique index on {}.{}, these values are used more than once: {}. '
+                               'Rename or remove the extra rows and run the migration again.'.format(
+                                   table_name, column,
+                                   ', '.join('{!r} (ids {})'.format(value, ', '.join(map(str, ids)))
+                                             for value, ids in found)))
+        table = Table(table_name, metadata, autoload_with=connection)
+        Index('ix_{}_{}'.format(table_name, column), table.c[column], unique=True).create(connection, checkfirst=True)
+
+    items = Table('items', metadata, autoload_with=connection)
+    Index('ix_items_store_id', items.c.store_id).create(connection, checkfirst=True)
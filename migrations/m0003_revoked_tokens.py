@@ -0,0 +1,19 @@
+"""
+revoked_tokens table backing the blocklist, shared by every worker process.
+"""
+from sqlalchemy import Column, Index, Integer, MetaData, String, Table
+
+VERSION = 3
+
+metadata = MetaData()
+
+revoked_tokens = Table('revoked_tokens', metadata,
+                       Column('id', Integer, primary_key=True),
+                       Column('jti', String(36), nullable=False, unique=True),
+                       Column('expires_at', Integer),
+                       Index('ix_revoked_tokens_expires_at', 'expires_at'),
+                       sqlite_autoincrement=True)
+
+
+def upgrade(connection):
+    metadata.create_all(connection, checkfirst=True)
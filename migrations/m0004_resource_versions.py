@@ -0,0 +1,18 @@
+"""
+resource_versions table holding the catalog version used for ETags and response cache keys.
+"""
+from sqlalchemy import Column, Integer, MetaData, String, Table, select
+
+VERSION = 4
+
+metadata = MetaData()
+
+resource_versions = Table('resource_versions', metadata,
+                          Column('name', String(40), primary_key=True),
+                          Column('version', Integer, nullable=False))
+
+
+def upgrade(connection):
+    metadata.create_all(connection, checkfirst=True)
+    if connection.execute(select(resource_versions.c.name).where(resource_versions.c.name == 'catalog')).first() is None:
+        connection.execute(resource_versions.insert().values(name='catalog', version=0))
@@ -0,0 +1,38 @@
+"""
+items_fts full-text index over item names, kept in sync by triggers, plus an index on items.price.
+
+items_fts is an external-content FTS5 table: it stores only the index and reads names back from
+items by rowid. The triggers mirror every insert, update and delete on items, so writes made by
+any code path, including raw SQL, stay searchable. Databases other than SQLite, and SQLite builds
+without FTS5, get only the price index; ItemModel.search falls back to LIKE matching there.
+"""
+from sqlalchemy import Index, MetaData, Table, text
+
+VERSION = 5
+
+CREATE_FTS = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5("
+    "name, content='items', content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS items_fts_insert AFTER INSERT ON items BEGIN "
+    "INSERT INTO items_fts (rowid, name) VALUES (new.id, new.name); END",
+    "CREATE TRIGGER IF NOT EXISTS items_fts_delete AFTER DELETE ON items BEGIN "
+    "INSERT INTO items_fts (items_fts, rowid, name) VALUES ('delete', old.id, old.name); END",
+    "CREATE TRIGGER IF NOT EXISTS items_fts_update AFTER UPDATE OF name ON items BEGIN "
+    "INSERT INTO items_fts (items_fts, rowid, name) VALUES ('delete', old.id, old.name); "
+    "INSERT INTO items_fts (rowid, name) VALUES (new.id, new.name); END",
+    "INSERT INTO items_fts (items_fts) VALUES ('rebuild')",  # index the rows that are already there
+]
+
+
+def has_fts5(connection):
+    return connection.dialect.name == 'sqlite' and \
+        connection.execute(text("SELECT sqlite_compileoption_used('ENABLE_FTS5')")).scalar() == 1
+
+
+def upgrade(connection):
+    items = Table('items', MetaData(), autoload_with=connection)
+    Index('ix_items_price', items.c.price).create(connection, checkfirst=True)
+
+    if has_fts5(connection):
+        for statement in CREATE_FTS:
+            connection.execute(text(statement))
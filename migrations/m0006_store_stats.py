@@ -0,0 +1,59 @@
+"""
+store_stats summary table kept up to date by triggers on items, plus an index on items (store_id, price).
+
+Each row holds one store's item count, priced item count, price total, minimum and maximum, so
+the stats endpoints read one row per store instead of aggregating its items. Counts and totals
+are adjusted incrementally; minimum and maximum are re-read through the (store_id, price) index,
+which is a single index seek however many items the store has. Databases other than SQLite get
+only the index and StoreStatsModel aggregates on the fly. `flask rebuild-store-stats` rebuilds
+the table from items.
+"""
+from sqlalchemy import Index, MetaData, Table, text
+
+VERSION = 6
+
+# Trigger bodies. Both are no-ops for an item without a store: WHERE store_id = NULL matches nothing
+ADD_ITEM = (
+    "INSERT INTO store_stats (store_id, item_count, priced_count, price_total, min_price, max_price) "
+    "SELECT new.store_id, 1, new.price IS NOT NULL, coalesce(new.price, 0), new.price, new.price "
+    "WHERE new.store_id IS NOT NULL "
+    "ON CONFLICT (store_id) DO UPDATE SET item_count = item_count + 1, "
+    "priced_count = priced_count + excluded.priced_count, price_total = price_total + excluded.price_total, "
+    "min_price = (SELECT MIN(price) FROM items WHERE store_id = new.store_id), "
+    "max_price = (SELECT MAX(price) FROM items WHERE store_id = new.store_id); "
+)
+REMOVE_ITEM = (
+    "UPDATE store_stats SET item_count = item_count - 1, "
+    "priced_count = priced_count - (old.price IS NOT NULL), price_total = price_total - coalesce(old.price, 0), "
+    "min_price = (SELECT MIN(price) FROM items WHERE store_id = old.store_id), "
+    "max_price = (SELECT MAX(price) FROM items WHERE store_id = old.store_id) "
+    "WHERE store_id = old.store_id; "
+    "DELETE FROM store_stats WHERE store_id = old.store_id AND item_count <= 0; "
+)
+
+CREATE_STATS = [
+    "CREATE TABLE IF NOT EXISTS store_stats ("
+    "store_id INTEGER PRIMARY KEY, item_count INTEGER NOT NULL, priced_count INTEGER NOT NULL, "
+    "price_total FLOAT NOT NULL, min_price FLOAT, max_price FLOAT)",
+    "CREATE TRIGGER IF NOT EXISTS store_stats_insert AFTER INSERT ON items BEGIN " + ADD_ITEM + "END",
+    "CREATE TRIGGER IF NOT EXISTS store_stats_delete AFTER DELETE ON items BEGIN " + REMOVE_ITEM + "END",
+    # the old row leaves its store and the new row joins one, which may be the same store
+    "CREATE TRIGGER IF NOT EXISTS store_stats_update AFTER UPDATE OF price, store_id ON items BEGIN "
+    + REMOVE_ITEM + ADD_ITEM + "END",
+]
+
+REBUILD = [
+    "DELETE FROM store_stats",
+    "INSERT INTO store_stats (store_id, item_count, priced_count, price_total, min_price, max_price) "
+    "SELECT store_id, COUNT(*), COUNT(price), coalesce(SUM(price), 0), MIN(price), MAX(price) "
+    "FROM items WHERE store_id IS NOT NULL GROUP BY store_id",
+]
+
+
+def upgrade(connection):
+    items = Table('items', MetaData(), autoload_with=connection)
+    Index('ix_items_store_id_price', items.c.store_id, items.c.price).create(connection, checkfirst=True)
+
+    if connection.dialect.name == 'sqlite':
+        for statement in CREATE_STATS + REBUILD:
+            connection.execute(text(statement))
@@ -1,15 +1,52 @@
+import re
+import weakref
+
+from sqlalchemy import case, column, func, inspect, table, text
+
+from cache import response_cache
+from changes import publish_on_commit
 from db import db
+from group_commit import write
+from fieldsets import rows_json, select_fields
+from models.version import CATALOG, VersionModel
+from pagination import paginate, paginate_rows
+
+NAME_CHUNK_SIZE = 500  # names per IN (...) query, well under SQLite's 999 bound parameter limit
+EXPORT_CHUNK_SIZE = 1000
+
+items_fts = table('items_fts', column('rowid'), column('rank'))  # created by migration 5 where FTS5 is available
+_fts_engines = weakref.WeakKeyDictionary()  # engine -> whether its database has items_fts
+
+# SQLite's RETURNING gives back the value as bound, before the column's REAL affinity applies, so a
+# price sent as 9 would come back as 9 rather than 9.0 like ItemModel.json() has it
+RETURNING_ITEM = 'id, name, CAST(price AS DOUBLE PRECISION) AS price, store_id'
+RETURNED_TYPES = {'id': db.Integer, 'name': db.String, 'price': db.Float, 'store_id': db.Integer}
+
+# PUT /item/<name> is one statement for a new name and two for an existing one: this INSERT returns no
+# row when the name exists, then UPDATE_BY_NAME runs. A single ON CONFLICT DO UPDATE could not tell the
+# change feed whether the row was created. Concurrent PUTs for a new name still cannot both insert
+# (needs SQLite 3.35+ or PostgreSQL)
+INSERT_UNLESS_EXISTS = text(
+    'INSERT INTO items (name, price, store_id) VALUES (:name, :price, :store_id) '
+    'ON CONFLICT (name) DO NOTHING '
+    'RETURNING ' + RETURNING_ITEM
+).columns(**RETURNED_TYPES)
+UPDATE_BY_NAME = text(
+    'UPDATE items SET price = :price, store_id = :store_id WHERE name = :name '
+    'RETURNING ' + RETURNING_ITEM
+).columns(**RETURNED_TYPES)
 
 
 class ItemModel(db.Model):
     __tablename__ = 'items'
+    JSON_FIELDS = ('id', 'name', 'price', 'store_id')
 
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(80))
-    price = db.Column(db.Float(precision=2))
+    name = db.Column(db.String(80), unique=True, index=True)
+    price = db.Column(db.Float(precision=2), index=True)
 
     # Establish foreign key to store
-    store_id = db.Column(db.Integer, db.ForeignKey('stores.id'))
+    store_id = db.Column(db.Integer, db.ForeignKey('stores.id'), index=True)
     store = db.relationship('StoreModel')
 
     def __init__(self, name, price, store_id):
@@ -24,15 +61,182 @@ class ItemModel(db.Model):
     def find_by_name(cls, name):
         return cls.query.filter_by(name=name).first()  # select * from items where name = name limit 1
 
+    @classmethod
+    def find_json_by_name(cls, name, fields=JSON_FIELDS):
+        row = db.session.execute(select_fields(cls, fields).where(cls.name == name).limit(1)).first()
+        return dict(zip(fields, row)) if row else None
+
+    @classmethod
+    def find_by_names(cls, names):
+        items = []
+        names = list(names)
+        for start in range(0, len(names), NAME_CHUNK_SIZE):
+            items.extend(cls.query.filter(cls.name.in_(names[start:start + NAME_CHUNK_SIZE])).all())  # select * from items where name in (...)
+        return items
+
+    @classmethod
+    def find_json_by_names(cls, names, fields=JSON_FIELDS):
+        """{name: json} for every name that exists, one IN (...) query per NAME_CHUNK_SIZE names."""
+        statement = select_fields(cls, fields).add_columns(cls.name)  # the trailing name keys the result
+        found = {}
+        names = list(names)
+        for start in range(0, len(names), NAME_CHUNK_SIZE):
+            rows = db.session.execute(statement.where(cls.name.in_(names[start:start + NAME_CHUNK_SIZE])))
+            found.update((row[-1], dict(zip(fields, row))) for row in rows)
+        return found
+
     @classmethod
     def find_all(cls):
         return cls.query.all()  # select * from items
 
+    @classmethod
+    def iter_json(cls):
+        # Walk the table in primary key order one chunk at a time, so memory stays flat however many rows there are
+        after = None
+        while True:
+            items, after = cls.find_page_json(after, EXPORT_CHUNK_SIZE)
+            yield from items
+            if after is None:
+                return
+
+    @classmethod
+    def find_page(cls, after, limit):
+        return paginate(cls.query, cls.id, after, limit)  # select * from items where id > after order by id limit n
+
+    @classmethod
+    def find_page_json(cls, after, limit, fields=JSON_FIELDS):
+        # Read-only listing: build json() dicts straight from Core rows, skipping ORM instances and the identity map
+        rows, next_cursor = paginate_rows(select_fields(cls, fields), cls.id, after, limit)
+        return rows_json(fields, rows), next_cursor
+
+    @classmethod
+    def search(cls, query, min_price=None, max_price=None, store_id=None, offset=0, limit=100, fields=JSON_FIELDS):
+        """
+        Items whose name contains every word of query, as whole words or word prefixes, best match first.
+        An empty query returns every item that passes the filters, cheapest first. Ranked results have no
+        stable key to page on, so the cursor is the offset of the next page, or None on the last page.
+        """
+        words = re.findall(r'\w+', query or '')
+        statement = select_fields(cls, fields)
+        if min_price is not None:
+            statement = statement.where(cls.price >= min_price)
+        if max_price is not None:
+            statement = statement.where(cls.price <= max_price)
+        if store_id is not None:
+            statement = statement.where(cls.store_id == store_id)
+
+        if not words:
+            statement = statement.order_by(cls.price, cls.id)
+        elif cls.has_fts():
+            # every word as a quoted prefix term; bm25 rank is lower for better matches
+            match = ' '.join('"{}"*'.format(word) for word in words)
+            statement = statement.join_from(cls, items_fts, items_fts.c.rowid == cls.id) \
+                .where(text('items_fts MATCH :match').bindparams(match=match)).order_by(items_fts.c.rank, cls.id)
+        else:
+            name = func.lower(cls.name)
+            for word in words:
+                statement = statement.where(name.contains(word.lower(), autoescape=True))
+            statement = statement.order_by(case((name == ' '.join(words).lower(), 0),
+                                                (name.startswith(words[0].lower(), autoescape=True), 1), else_=2),
+                                           cls.name, cls.id)
+
+        rows = db.session.execute(statement.offset(offset).limit(limit + 1)).all()
+        if len(rows) > limit:
+            return rows_json(fields, rows[:limit]), offset + limit
+        return rows_json(fields, rows), None
+
+    @classmethod
+    def has_fts(cls):
+        engine = db.engine
+        if engine not in _fts_engines:
+            _fts_engines[engine] = inspect(engine).has_table('items_fts')
+        return _fts_engines[engine]
+
+    def cache_tags(self):
+        # Include the values being replaced, so an item moved between stores invalidates both of them
+        state = inspect(self)
+        names = {self.name, *state.attrs.name.history.deleted}
+        store_ids = {self.store_id, *state.attrs.store_id.history.deleted}
+        return [('item', name) for name in names] + [('store_id', store_id) for store_id in store_ids] + \
+            [('items',), ('stores',)]
+
     def upsert(self):
-        db.session.add(self)
-        db.session.commit()
+        tags = self.cache_tags()
+        created = inspect(self).key is None
+
+        def unit():
+            db.session.add(self)
+            VersionModel.bump(CATALOG)
+            db.session.flush()  # assigns the id
+            publish_on_commit(db.session, ('item', 'created' if created else 'updated', self.json()))
+
+        write(unit, self)
+        response_cache.invalidate(*tags)
+
+    @classmethod
+    def upsert_many(cls, rows):
+        """
+        Insert or update every {name, price, store_id} row in a single transaction.
+        Returns (item json, created) pairs in the order given.
+        """
+        tags = set()
+
+        def unit():
+            existing = {item.name: item for item in cls.find_by_names(row['name'] for row in rows)}
+            results = []
+            for row in rows:
+                item = existing.get(row['name'])
+                created = item is None
+                if created:
+                    item = cls(row['name'], row['price'], row['store_id'])
+                    db.session.add(item)
+                else:
+                    item.price = row['price']
+                    item.store_id = row['store_id']
+                tags.update(item.cache_tags())
+                results.append((item, created))
+            db.session.flush()  # assigns the new ids
+            VersionModel.bump(CATALOG)
+            # serialised before the commit expires every item, which would reload each one
+            results = [(item.json(), created) for item, created in results]
+            publish_on_commit(db.session, *(('item', 'created' if created else 'updated', item)
+                                            for item, created in results))
+            return results
+
+        results = write(unit)
+        response_cache.invalidate(*tags)
+        return results
+
+    @classmethod
+    def upsert_by_name(cls, name, price, store_id):
+        def unit():
+            values = {'name': name, 'price': price, 'store_id': store_id}
+            while True:
+                row = db.session.execute(INSERT_UNLESS_EXISTS, values).mappings().first()
+                action = 'created'
+                if row is None:
+                    row = db.session.execute(UPDATE_BY_NAME, values).mappings().first()
+                    action = 'updated'
+                if row is not None:
+                    break
+                # deleted between the two statements (PostgreSQL; SQLite holds the write lock), insert it again
+            VersionModel.bump(CATALOG)
+            publish_on_commit(db.session, ('item', action, dict(row)))
+            return dict(row)
+
+        row = write(unit)
+        response_cache.invalidate(('item', name), ('store_id', store_id), ('items',), ('stores',))
+        return row
 
     def delete_from_db(self):
-        db.session.delete(self)
-        db.session.commit()
+        tags = self.cache_tags()
+        deleted = self.json()
+
+        def unit():
+            db.session.delete(self)
+            VersionModel.bump(CATALOG)
+            publish_on_commit(db.session, ('item', 'deleted', deleted))
+
+        write(unit, self)
+        response_cache.invalidate(*tags)
 
@@ -0,0 +1,37 @@
+from db import db
+
+
+class RevokedTokenModel(db.Model):
+    __tablename__ = 'revoked_tokens'
+    __table_args__ = {'sqlite_autoincrement': True}  # ids must never be reused, SQLite workers sync on id > last seen
+
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(36), unique=True, nullable=False)
+    expires_at = db.Column(db.Integer, index=True)  # the token's exp claim, NULL if it never expires
+
+    def __init__(self, jti, expires_at):
+        self.jti = jti
+        self.expires_at = expires_at
+
+    @classmethod
+    def find_since(cls, last_id, now):
+        """
+        Revocations a worker that has seen every id up to last_id may have missed. On SQLite writes are
+        serialised, so ids commit in order and id > last_id is enough. A sequence elsewhere (PostgreSQL)
+        can commit a lower id after a higher one, so every revocation that has not expired is read again.
+        """
+        query = cls.query
+        if db.engine.dialect.name == 'sqlite':
+            query = query.filter(cls.id > last_id)  # select * from revoked_tokens where id > last_id
+        else:
+            query = query.filter(db.or_(cls.expires_at.is_(None), cls.expires_at >= now))
+        return query.order_by(cls.id).all()
+
+    @classmethod
+    def delete_expired(cls, now):
+        cls.query.filter(cls.expires_at < now).delete(synchronize_session=False)
+        db.session.commit()
+
+    def save_to_db(self):
+        db.session.add(self)
+        db.session.commit()
@@ -1,13 +1,26 @@
+from collections import defaultdict
+
+from sqlalchemy import inspect, select
+
+from cache import response_cache
+from changes import publish_on_commit
 from db import db
+from group_commit import write
+from fieldsets import select_fields
+from models.version import CATALOG, VersionModel
+from pagination import paginate, paginate_rows
+from models.item import ItemModel
 
 
 class StoreModel(db.Model):
     __tablename__ = 'stores'
+    JSON_FIELDS = ('id', 'name', 'items')
 
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(80))
+    name = db.Column(db.String(80), unique=True, index=True)
 
-    items = db.relationship('ItemModel', lazy='dynamic')
+    # ordered explicitly: after migration 6 SQLite reads a store's items through (store_id, price)
+    items = db.relationship('ItemModel', lazy='dynamic', order_by='ItemModel.id')
 
     def __init__(self, name):
         self.name = name
@@ -15,15 +28,82 @@ class StoreModel(db.Model):
     def json(self):
         return {'id': self.id, 'name': self.name, 'items': [item.json() for item in self.items.all()]}
 
+    @classmethod
+    def json_many(cls, stores, fields=JSON_FIELDS):
+        # Two queries however many stores there are: the stores themselves, then every item whose
+        # store_id falls in their id range, grouped in Python rather than one self.items query per store.
+        # The items come back as Core rows, the same output as ItemModel.json() without an ORM instance each
+        if not stores:
+            return []
+        columns = [field for field in fields if field != 'items']
+        if 'items' not in fields:
+            return [{field: getattr(store, field) for field in columns} for store in stores]
+
+        ids = [store.id for store in stores]
+        items = db.session.execute(
+            select(ItemModel.id, ItemModel.name, ItemModel.price, ItemModel.store_id)
+            .where(ItemModel.store_id.between(min(ids), max(ids)))
+            .order_by(ItemModel.id)
+        )
+
+        items_by_store = defaultdict(list)
+        for id_, name, price, store_id in items:
+            items_by_store[store_id].append({'id': id_, 'name': name, 'price': price, 'store_id': store_id})
+
+        stores_json = []
+        for store in stores:
+            store_json = {field: getattr(store, field) for field in columns}
+            store_json['items'] = items_by_store[store.id]
+            stores_json.append(store_json)
+        return stores_json
+
     @classmethod
     def find_by_name(cls, name):
         return cls.query.filter_by(name=name).first()  # select * from stores where name = name limit 1
 
+    @classmethod
+    def find_row_by_name(cls, name, fields=JSON_FIELDS):
+        statement = select_fields(cls, [field for field in fields if field != 'items'])
+        return db.session.execute(statement.where(cls.name == name).limit(1)).first()
+
+    @classmethod
+    def find_all(cls):
+        return cls.query.order_by(cls.id).all()  # select * from stores order by id
+
+    @classmethod
+    def find_page(cls, after, limit):
+        return paginate(cls.query, cls.id, after, limit)  # select * from stores where id > after order by id limit n
+
+    @classmethod
+    def find_page_json(cls, after, limit, fields=JSON_FIELDS):
+        statement = select_fields(cls, [field for field in fields if field != 'items'])
+        stores, next_cursor = paginate_rows(statement, cls.id, after, limit)
+        return cls.json_many(stores, fields), next_cursor
+
+    def cache_tags(self):
+        return [('store', self.name), ('store_id', self.id), ('stores',)]
+
     def upsert(self):
-        db.session.add(self)
-        db.session.commit()
+        created = inspect(self).key is None
+
+        def unit():
+            db.session.add(self)
+            VersionModel.bump(CATALOG)
+            db.session.flush()  # assigns the id
+            publish_on_commit(db.session, ('store', 'created' if created else 'updated',
+                                           {'id': self.id, 'name': self.name}))
+
+        write(unit, self)
+        response_cache.invalidate(*self.cache_tags())
 
     def delete_from_db(self):
-        db.session.delete(self)
-        db.session.commit()
+        tags = self.cache_tags()
+        deleted = {'id': self.id, 'name': self.name}
+
+        def unit():
+            db.session.delete(self)
+            VersionModel.bump(CATALOG)
+            publish_on_commit(db.session, ('store', 'deleted', deleted))
 
+        write(unit, self)
+        response_cache.invalidate(*tags)
@@ -0,0 +1,81 @@
+import weakref
+
+from sqlalchemy import Float, Integer, column, func, select, table, text
+
+from db import db
+from migrations.m0006_store_stats import REBUILD
+from models.item import ItemModel
+from models.store import StoreModel
+from pagination import paginate_rows
+
+# Created only by migration 6, not db.create_all(): without its triggers the table would stay empty
+store_stats = table('store_stats', column('store_id', Integer), column('item_count', Integer),
+                    column('priced_count', Integer),  # items with a price, the divisor for avg_price
+                    column('price_total', Float), column('min_price', Float), column('max_price', Float))
+_stats_engines = weakref.WeakKeyDictionary()  # engine -> whether its database has the trigger-maintained table
+
+HAS_TRIGGERS = text("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'store_stats_insert'")
+
+
+class StoreStatsModel:
+    """One row per store with items, maintained by the triggers from migration 6."""
+    JSON_FIELDS = ('id', 'name', 'item_count', 'min_price', 'max_price', 'avg_price')
+
+    @classmethod
+    def has_table(cls):
+        engine = db.engine
+        if engine not in _stats_engines:
+            if engine.dialect.name != 'sqlite':
+                _stats_engines[engine] = False
+            else:
+                with engine.connect() as connection:
+                    _stats_engines[engine] = connection.execute(HAS_TRIGGERS).first() is not None
+        return _stats_engines[engine]
+
+    @classmethod
+    def statement(cls):
+        """select() of JSON_FIELDS for every store, from the summary table or, without it, by aggregating items."""
+        if cls.has_table():
+            stats = store_stats.c
+            return select(
+                StoreModel.id, StoreModel.name, func.coalesce(stats.item_count, 0), stats.min_price, stats.max_price,
+                stats.price_total / func.nullif(stats.priced_count, 0)
+            ).outerjoin(store_stats, stats.store_id == StoreModel.id)
+        return select(
+            StoreModel.id, StoreModel.name, func.count(ItemModel.id), func.min(ItemModel.price),
+            func.max(ItemModel.price), func.avg(ItemModel.price)
+        ).outerjoin(ItemModel, ItemModel.store_id == StoreModel.id).group_by(StoreModel.id, StoreModel.name)
+
+    @classmethod
+    def find_json_by_name(cls, name):
+        row = db.session.execute(cls.statement().where(StoreModel.name == name)).first()
+        return dict(zip(cls.JSON_FIELDS, row)) if row else None
+
+    @classmethod
+    def find_page_json(cls, after, limit):
+        rows, next_cursor = paginate_rows(cls.statement(), StoreModel.id, after, limit)
+        return [dict(zip(cls.JSON_FIELDS, row)) for row in rows], next_cursor
+
+    @classmethod
+    def rebuild(cls):
+        """
+        Recompute every row from items in one transaction.
+        Returns the number of stores whose summary was wrong, e.g. after writes made with the triggers dropped.
+        """
+        if not cls.has_table():
+            return 0  # nothing to rebuild, the stats are aggregated on every read
+        before = {row[0]: row for row in db.session.execute(select(store_stats))}
+        for statement in REBUILD:
+            db.session.execute(text(statement))
+        after = {row[0]: row for row in db.session.execute(select(store_stats))}
+        db.session.commit()
+
+        return sum(1 for store_id in before.keys() | after.keys()
+                   if not _same(before.get(store_id), after.get(store_id)))
+
+
+def _same(old, new):
+    # price_total is a running float sum, so allow for rounding drift
+    if old is None or new is None:
+        return old is new
+    return old[:3] == new[:3] and abs(old[3] - new[3]) < 1e-6 and old[4:] == new[4:]
@@ -1,11 +1,27 @@
+from sqlalchemy import text
+
 from db import db
+from group_commit import write
+from fieldsets import rows_json, select_fields
+from pagination import paginate, paginate_rows
+
+UPDATE_PASSWORD = text('UPDATE users SET password = :password WHERE id = :id RETURNING id, username') \
+    .columns(id=db.Integer, username=db.String)
+
+# Returns no row when the username is taken, so concurrent PUTs for a new user cannot both insert
+INSERT_UNLESS_TAKEN = text(
+    'INSERT INTO users (username, password) VALUES (:username, :password) '
+    'ON CONFLICT (username) DO NOTHING '
+    'RETURNING id, username'
+).columns(id=db.Integer, username=db.String)
 
 
 class UserModel(db.Model):
     __tablename__ = 'users'
+    JSON_FIELDS = ('id', 'username')
 
     id = db.Column(db.Integer, primary_key=True)
-    username = db.Column(db.String(80))
+    username = db.Column(db.String(80), unique=True, index=True)
     password = db.Column(db.String(80))
 
     def __init__(self, username, password):
@@ -19,16 +35,25 @@ class UserModel(db.Model):
         }
 
     def save_to_db(self):
-        db.session.add(self)
-        db.session.commit()
+        write(lambda: db.session.add(self), self)
 
     def upsert(self):
-        db.session.add(self)
-        db.session.commit()
+        write(lambda: db.session.add(self), self)
+
+    @classmethod
+    def upsert_password(cls, _id, username, password):
+        """Set user _id's password, or create the user if there is none; None if username belongs to another user."""
+        def unit():
+            row = db.session.execute(UPDATE_PASSWORD, {'id': _id, 'password': password}).mappings().first()
+            if row is None:
+                row = db.session.execute(INSERT_UNLESS_TAKEN,
+                                         {'username': username, 'password': password}).mappings().first()
+            return dict(row) if row else None
+
+        return write(unit)
 
     def delete_from_db(self):
-        db.session.delete(self)
-        db.session.commit()
+        write(lambda: db.session.delete(self), self)
 
     @classmethod
     def find_by_username(cls, username):
@@ -38,3 +63,17 @@ class UserModel(db.Model):
     def find_by_id(cls, _id):
         return cls.query.filter_by(id=_id).first()  # select * from user where id = _id limit 1
 
+    @classmethod
+    def find_page(cls, after, limit):
+        return paginate(cls.query, cls.id, after, limit)  # select * from users where id > after order by id limit n
+
+    @classmethod
+    def find_page_json(cls, after, limit, fields=JSON_FIELDS):
+        rows, next_cursor = paginate_rows(select_fields(cls, fields), cls.id, after, limit)
+        return rows_json(fields, rows), next_cursor
+
+    @classmethod
+    def find_json_by_id(cls, _id, fields=JSON_FIELDS):
+        row = db.session.execute(select_fields(cls, fields).where(cls.id == _id)).first()
+        return dict(zip(fields, row)) if row else None
+
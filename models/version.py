@@ -0,0 +1,25 @@
+from db import db
+
+CATALOG = 'catalog'  # bumped by every item and store write
+
+
+class VersionModel(db.Model):
+    __tablename__ = 'resource_versions'
+
+    name = db.Column(db.String(40), primary_key=True)
+    version = db.Column(db.Integer, nullable=False)
+
+    def __init__(self, name, version):
+        self.name = name
+        self.version = version
+
+    @classmethod
+    def current(cls, name):
+        return db.session.query(cls.version).filter_by(name=name).scalar() or 0  # select version from resource_versions where name = name
+
+    @classmethod
+    def bump(cls, name):
+        # Runs inside the caller's transaction, so the new version commits (or rolls back) with the write
+        updated = cls.query.filter_by(name=name).update({cls.version: cls.version + 1}, synchronize_session=False)
+        if not updated:
+            db.session.add(cls(name, 1))
@@ -0,0 +1,60 @@
+from flask_restful import reqparse
+
+from db import db
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+page_parser = reqparse.RequestParser()
+page_parser.add_argument('limit',
+                         type=int,
+                         location='args',
+                         help="Page size must be a whole number"
+                         )
+page_parser.add_argument('after',
+                         type=int,
+                         location='args',
+                         help="Cursor must be a whole number"
+                         )
+
+
+def page_args():
+    """Read ?limit=&after= from the query string, clamping limit to MAX_PAGE_SIZE."""
+    args = page_parser.parse_args()
+    limit = args['limit'] or DEFAULT_PAGE_SIZE
+    return args['after'], max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def paginate(query, column, after, limit):
+    """
+    Keyset pagination on an ascending, unique column (the primary key).
+    Returns the page and the cursor for the next one, or None on the last page.
+    """
+    if after is not None:
+        query = query.filter(column > after)
+    rows = query.order_by(column).limit(limit + 1).all()  # one extra row tells us whether there is a next page
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, rows[-1].id
+    return rows, None
+
+
+def paginate_rows(statement, column, after, limit):
+    """The same as paginate(), for a Core select() whose rows include column."""
+    if after is not None:
+        statement = statement.where(column > after)
+    rows = db.session.execute(statement.order_by(column).limit(limit + 1)).all()
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, getattr(rows[-1], column.key)
+    return rows, None
+
+
+def page_response(key, values, next_cursor, **extra):
+    response = {key: values}
+    response.update(extra)
+    if next_cursor is not None:
+        response['next'] = next_cursor
+    return response
@@ -0,0 +1,87 @@
+"""
+Per-request SQL accounting built on SQLAlchemy cursor events.
+
+Every statement run while handling a request is counted and timed. After the request a structured
+log line records the totals and the slowest statement; in debug mode they are also returned as
+X-Query-* response headers. Statements slower than SLOW_QUERY_THRESHOLD_MS go to the slow query log
+together with the resource and HTTP method that issued them.
+"""
+import json
+import logging
+import time
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DEFAULT_SLOW_QUERY_THRESHOLD_MS = 100
+
+logger = logging.getLogger('query_stats')
+slow_query_logger = logging.getLogger('query_stats.slow')
+
+
+def resource_name():
+    view = current_app.view_functions.get(request.endpoint)
+    return getattr(view, 'view_class', view).__name__ if view else None
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # kept on the statement's own execution context: a failed statement never gets after_cursor_execute,
+    # so a start time pushed onto a per-connection stack would be left behind there
+    context.query_start_time = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed_ms = (time.perf_counter() - context.query_start_time) * 1000
+    if not has_request_context() or 'query_stats' not in g:
+        return
+
+    stats = g.query_stats
+    stats['count'] += 1
+    stats['time_ms'] += elapsed_ms
+    if elapsed_ms > stats['slowest_ms']:
+        stats['slowest_ms'] = elapsed_ms
+        stats['slowest'] = statement
+
+    if elapsed_ms >= current_app.config.get('SLOW_QUERY_THRESHOLD_MS', DEFAULT_SLOW_QUERY_THRESHOLD_MS):
+        slow_query_logger.warning(json.dumps({
+            'resource': resource_name(),
+            'method': request.method,
+            'path': request.path,
+            'duration_ms': round(elapsed_ms, 3),
+            'statement': statement,
+        }))
+
+
+def start_request():
+    g.query_stats = {'count': 0, 'time_ms': 0.0, 'slowest_ms': 0.0, 'slowest': None}
+
+
+def finish_request(response):
+    stats = g.pop('query_stats', None)
+    if stats is None:
+        return response
+
+    logger.info(json.dumps({
+        'resource': resource_name(),
+        'method': request.method,
+        'path': request.path,
+        'status': response.status_code,
+        'query_count': stats['count'],
+        'query_time_ms': round(stats['time_ms'], 3),
+        'slowest_query_ms': round(stats['slowest_ms'], 3),
+        'slowest_query': stats['slowest'],
+    }))
+
+    if current_app.debug:
+        response.headers['X-Query-Count'] = str(stats['count'])
+        response.headers['X-Query-Time-Ms'] = '{:.3f}'.format(stats['time_ms'])
+        response.headers['X-Slowest-Query-Ms'] = '{:.3f}'.format(stats['slowest_ms'])
+    return response
+
+
+def init_app(app):
+    app.before_request(start_request)
+    app.after_request(finish_request)
@@ -0,0 +1,217 @@
+"""
+Token-bucket rate limiting and admission control.
+
+Each limited resource gets a bucket per client, keyed by JWT identity when the request carries a
+valid access token and by client IP otherwise. A bucket holds up to `burst` tokens and refills at
+`rate` tokens per second; a request that finds it empty gets a 429 with Retry-After.
+
+Separately, at most MAX_CONCURRENT_REQUESTS requests are handled at once per worker. Requests beyond
+that wait up to ADMISSION_TIMEOUT_MS for a slot and then get a 503, so a burst is shed early instead
+of queueing until every request times out.
+
+Buckets live in process memory by default. Set RATELIMIT_STORAGE to a file path to keep them in a
+SQLite database shared by every worker process on the host.
+"""
+import math
+import sqlite3
+import threading
+import time
+
+from flask import current_app, g, jsonify, request
+
+from metrics import metrics
+from token_cache import token_cache
+
+DEFAULT_LIMITS = {
+    # resource class -> (tokens per second, burst)
+    'UserLogin': (10 / 60, 10),
+    'UserRegister': (10 / 60, 10),
+    'ItemList': (20, 100),
+    'ItemExport': (1 / 10, 3),
+}
+DEFAULT_MAX_CONCURRENT_REQUESTS = 64
+DEFAULT_ADMISSION_TIMEOUT_MS = 50
+EXEMPT_RESOURCES = {'Health', 'HealthReady', 'Metrics'}  # probes and scrapes must get through under load
+LONG_LIVED_RESOURCES = {'Changes'}  # event streams would hold a request slot for as long as they are open
+
+
+class MemoryBuckets:
+    """Buckets for a single worker process."""
+
+    MAX_KEYS = 100000
+    IDLE_SECONDS = 3600  # long enough for any configured bucket to have refilled
+
+    def __init__(self):
+        self._buckets = {}  # key -> (tokens, updated)
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst, now=None):
+        """Take one token from key's bucket; return 0 if it had one, else seconds until it will."""
+        now = time.time() if now is None else now
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + max(0.0, now - updated) * rate)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now)
+                return (1 - tokens) / rate
+            self._buckets[key] = (tokens - 1, now)
+            if len(self._buckets) > self.MAX_KEYS:
+                self._prune(now)
+            return 0
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+    def _prune(self, now):
+        # a bucket that has refilled completely is the same as no bucket
+        self._buckets = {key: bucket for key, bucket in self._buckets.items() if now - bucket[1] < self.IDLE_SECONDS}
+
+
+class SQLiteBuckets:
+    """Buckets in a SQLite file, so every worker on the host draws from the same ones."""
+
+    IDLE_SECONDS = MemoryBuckets.IDLE_SECONDS
+    PRUNE_INTERVAL = 60  # seconds between deletes of idle buckets, per worker
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._pruned = 0
+        with self._connection() as connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS rate_buckets '
+                               '(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)')
+            connection.execute('CREATE INDEX IF NOT EXISTS ix_rate_buckets_updated ON rate_buckets (updated)')
+
+    def take(self, key, rate, burst, now=None):
+        now = time.time() if now is None else now
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')  # serialise read-modify-write across processes
+        try:
+            row = connection.execute('SELECT tokens, updated FROM rate_buckets WHERE key = ?', (key,)).fetchone()
+            tokens, updated = row if row else (burst, now)
+            tokens = min(burst, tokens + max(0.0, now - updated) * rate)
+            wait = 0 if tokens >= 1 else (1 - tokens) / rate
+            connection.execute('INSERT INTO rate_buckets (key, tokens, updated) VALUES (?, ?, ?) '
+                               'ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated',
+                               (key, tokens - 1 if not wait else tokens, now))
+            connection.execute('COMMIT')
+        except:
+            connection.execute('ROLLBACK')
+            raise
+        if now - self._pruned >= self.PRUNE_INTERVAL:
+            self._pruned = now
+            # one row per resource and client would otherwise pile up; a refilled bucket is the same as none
+            connection.execute('DELETE FROM rate_buckets WHERE updated < ?', (now - self.IDLE_SECONDS,))
+        return wait
+
+    def clear(self):
+        connection = self._connection()
+        connection.execute('DELETE FROM rate_buckets')
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+
+class RateLimiter:
+
+    def __init__(self):
+        self._buckets = None
+        self._storage = None
+        self._lock = threading.Lock()
+        self._slots = None
+        self.in_flight = 0
+
+    def buckets(self):
+        storage = current_app.config.get('RATELIMIT_STORAGE', 'memory')
+        if self._storage != storage:
+            with self._lock:
+                if self._storage != storage:
+                    self._buckets = MemoryBuckets() if storage == 'memory' else SQLiteBuckets(storage)
+                    self._storage = storage
+        return self._buckets
+
+    def clear(self):
+        """Empty every bucket and pick up a changed MAX_CONCURRENT_REQUESTS on the next request."""
+        if self._buckets is not None:
+            self._buckets.clear()
+        self._slots = None
+
+    def client_key(self):
+        """'user:<identity>' for a valid bearer token, otherwise 'ip:<address>'."""
+        header = request.headers.get('Authorization', '')
+        if header.startswith('Bearer '):
+            try:
+                return 'user:{}'.format(token_cache.decode_token(header[7:])['identity'])
+            except Exception:
+                pass  # the view's own JWT check reports bad tokens
+        return 'ip:{}'.format(request.remote_addr)
+
+    def start_request(self):
+        if not current_app.config.get('RATELIMIT_ENABLED', True):
+            return None
+        view = current_app.view_functions.get(request.endpoint)
+        resource = getattr(view, 'view_class', view).__name__ if view else None
+        if resource in EXEMPT_RESOURCES:
+            return None
+
+        limit = current_app.config.get('RATELIMIT_LIMITS', DEFAULT_LIMITS).get(resource)
+        if limit:
+            wait = self.buckets().take('{}:{}'.format(resource, self.client_key()), *limit)
+            if wait:
+                metrics.inc('rate_limited_total', (('resource', resource),))
+                response = jsonify({'message': 'Too many requests, retry in {} seconds.'.format(math.ceil(wait))})
+                response.status_code = 429
+                response.headers['Retry-After'] = str(math.ceil(wait))
+                return response
+
+        if resource in LONG_LIVED_RESOURCES:
+            return None
+        slots = self._slots_for(current_app)
+        timeout = current_app.config.get('ADMISSION_TIMEOUT_MS', DEFAULT_ADMISSION_TIMEOUT_MS) / 1000
+        if not slots.acquire(timeout=timeout):
+            metrics.inc('admission_rejected_total', (('resource', resource),))
+            response = jsonify({'message': 'Server is busy, try again shortly.'})
+            response.status_code = 503
+            response.headers['Retry-After'] = '1'
+            return response
+        g.admission_slots = slots
+        with self._lock:
+            self.in_flight += 1
+        return None
+
+    def finish_request(self, exc):
+        slots = g.pop('admission_slots', None)
+        if slots is not None:
+            with self._lock:
+                self.in_flight -= 1
+            slots.release()
+
+    def _slots_for(self, app):
+        if self._slots is None:
+            with self._lock:
+                if self._slots is None:
+                    self._slots = threading.BoundedSemaphore(
+                        app.config.get('MAX_CONCURRENT_REQUESTS', DEFAULT_MAX_CONCURRENT_REQUESTS))
+        return self._slots
+
+    def init_app(self, app):
+        app.before_request(self.start_request)
+        app.teardown_request(self.finish_request)
+
+
+limiter = RateLimiter()
+metrics.counter('rate_limited_total', 'Requests refused with 429 because their token bucket was empty, by resource.')
+metrics.counter('admission_rejected_total',
+                'Requests refused with 503 because every request slot was busy, by resource.')
+
+
+@metrics.collector
+def collect_admission():
+    return [('requests_in_flight', 'gauge', 'Requests currently holding a request slot.', [((), limiter.in_flight)])]
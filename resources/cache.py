@@ -0,0 +1,9 @@
+from flask_restful import Resource
+
+from cache import response_cache
+
+
+class CacheStats(Resource):
+
+    def get(self):
+        return response_cache.stats()
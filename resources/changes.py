@@ -0,0 +1,25 @@
+from flask import Response, current_app, request
+from flask_restful import Resource, reqparse
+from flask_jwt_extended import jwt_required
+
+from changes import DEFAULT_HEARTBEAT_SECONDS, change_feed
+
+
+class Changes(Resource):
+    parser = reqparse.RequestParser()
+    parser.add_argument('last_event_id', type=int, location='args', help="Last event ID must be a whole number")
+    parser.add_argument('follow', type=str, location='args', default='true')
+
+    @jwt_required
+    def get(self):
+        args = Changes.parser.parse_args()
+        last_id = args['last_event_id']  # for clients that cannot set headers, e.g. a first EventSource connect
+        if request.headers.get('Last-Event-ID', '').isdigit():
+            last_id = int(request.headers['Last-Event-ID'])
+
+        heartbeat = current_app.config.get('CHANGES_HEARTBEAT_SECONDS', DEFAULT_HEARTBEAT_SECONDS)
+        events = change_feed.stream(last_id, heartbeat, follow=args['follow'].lower() not in ('0', 'false', 'no'))
+        # not stream_with_context: the stream needs no database, so the request context (and the
+        # session the JWT check used) is torn down now instead of holding a pooled connection open
+        return Response(events, mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
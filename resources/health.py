@@ -1,7 +1,96 @@
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from flask import current_app
 from flask_restful import Resource
 
+from blocklist import BLOCKLIST
+from db import db
+
+PROBE_TIMEOUT = 1.0  # seconds
+CACHE_SECONDS = 2.0  # however often the load balancer polls, the database is probed at most this often
+MAX_POOL_SATURATION = 0.9
+MIN_FREE_DISK_BYTES = 100 * 1024 * 1024
+
+_probes = ThreadPoolExecutor(max_workers=1, thread_name_prefix='health-probe')
+_running = None  # the last probe, while it is still running
+
+
+def probe_database(engine):
+    # A read only: a busy writer holding the lock is normal under load, not a reason to leave the pool
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute('SELECT 1')
+        cursor.close()
+        connection.rollback()
+    finally:
+        connection.close()
+
+
+def check_database(engine, timeout):
+    global _running
+    if _running is not None and not _running.done():
+        return {'ok': False, 'error': 'the previous probe has not finished'}  # rather than queue behind it
+    start = time.perf_counter()
+    try:
+        _running = _probes.submit(probe_database, engine)
+        _running.result(timeout=timeout)
+    except TimeoutError:
+        return {'ok': False, 'error': 'timed out after {}s'.format(timeout)}
+    except Exception as e:
+        return {'ok': False, 'error': str(e)}
+    return {'ok': True, 'latency_ms': round((time.perf_counter() - start) * 1000, 3)}
+
+
+def check_pool(pool, max_overflow):
+    if not hasattr(pool, 'checkedout'):
+        return {'ok': True}
+    checked_out = pool.checkedout()
+    capacity = pool.size() + max(max_overflow, 0)  # -1 means unlimited overflow, so judge by pool_size alone
+    saturation = checked_out / capacity if capacity else 0
+    return {'ok': saturation < MAX_POOL_SATURATION, 'checked_out': checked_out, 'overflow': max(pool.overflow(), 0),
+            'capacity': capacity, 'saturation': round(saturation, 3)}
+
+
+def check_disk(engine):
+    if engine.dialect.name != 'sqlite' or not engine.url.database:
+        return {'ok': True}
+    free = shutil.disk_usage(os.path.dirname(os.path.abspath(engine.url.database))).free
+    return {'ok': free >= MIN_FREE_DISK_BYTES, 'free_bytes': free}
+
 
 class Health(Resource):
 
     def get(self):
         return {'message': 'ok'}
+
+
+class HealthReady(Resource):
+    _lock = threading.Lock()
+    _cached = None  # (expires, body, status)
+
+    def get(self):
+        cached = HealthReady._cached
+        if cached and cached[0] > time.monotonic():
+            return cached[1], cached[2]
+
+        with HealthReady._lock:
+            cached = HealthReady._cached
+            if not (cached and cached[0] > time.monotonic()):
+                engine = db.engine
+                checks = {
+                    'database': check_database(engine, current_app.config.get('HEALTH_PROBE_TIMEOUT', PROBE_TIMEOUT)),
+                    'pool': check_pool(engine.pool, current_app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+                                       .get('max_overflow', 10)),  # 10 is QueuePool's own default
+                    'disk': check_disk(engine),
+                    'blocklist': {'ok': True, 'size': len(BLOCKLIST)},
+                }
+                ready = all(check['ok'] for check in checks.values())
+                body = {'message': 'ok' if ready else 'degraded', 'checks': checks}
+                cached = HealthReady._cached = (time.monotonic() + CACHE_SECONDS, body, 200 if ready else 503)
+
+        return cached[1], cached[2]
@@ -1,37 +1,48 @@
+import json
+
+from flask import Response, request, stream_with_context
 from flask_restful import Resource, reqparse
-from flask_jwt_extended import jwt_required, get_jwt_claims, jwt_optional, get_jwt_identity, fresh_jwt_required
+from flask_jwt_extended import jwt_required, get_jwt_claims, jwt_optional, get_jwt_identity, fresh_jwt_required, \
+    verify_jwt_in_request
+from conditional import cached_get
+from fieldsets import fields_arg
 from models.item import ItemModel
+from pagination import page_args, page_response
+from schema import Schema
+
+MAX_BATCH_SIZE = 10000
+MAX_LOOKUP_NAMES = 1000
 
 
 class Item(Resource):
-    parser = reqparse.RequestParser()
-    parser.add_argument('price',
-                        type=float,
-                        required=True,
-                        help="This field cannot be empty"
-                        )
-    parser.add_argument('store_id',
-                        type=int,
-                        required=True,
-                        help="Store ID cannot be empty"
-                        )
+    schema = Schema(
+        ('price', float, "This field cannot be empty"),
+        ('store_id', int, "Store ID cannot be empty"),
+    )
 
     @jwt_required
     def get(self, name):
+        fields = fields_arg(ItemModel.JSON_FIELDS)
+
+        def load():
+            item = ItemModel.find_json_by_name(name, fields)
+            if item:
+                return item, [('item', name)]
+
         try:
-            item = ItemModel.find_by_name(name)
+            response = cached_get(('item', name, fields), load)
         except:
             return {"message": "An error occurred whilst looking up the item"}, 500
 
-        if item:
-            return item.json()
+        if response is not None:
+            return response
         return {'message': 'Item not found'}, 404
 
     def post(self, name):
         if ItemModel.find_by_name(name):
             return {'message': "An item with name '{}' already exists.".format(name)}, 400
 
-        data = Item.parser.parse_args()
+        data = Item.schema.parse()
         item = ItemModel(name, data['price'], data['store_id'])
 
         try:
@@ -56,33 +67,157 @@ class Item(Resource):
         return {'message': "Item deleted"}
 
     def put(self, name):
-        data = Item.parser.parse_args()
+        data = Item.schema.parse()
 
         try:
-            item = ItemModel.find_by_name(name)
+            return ItemModel.upsert_by_name(name, data['price'], data['store_id'])
         except:
             return {"message": "An error occurred whilst inserting the item"}, 500
 
-        if item:
-            item.price = data['price']
-            item.store_id = data['store_id']
-        else:
-            item = ItemModel(name, data['price'], data['store_id'])
 
-        item.upsert()
+def lookup(names):
+    """Found items in the order asked for and the names that do not exist, for ItemList and ItemLookup."""
+    names = list(dict.fromkeys(name.strip() for name in names if isinstance(name, str) and name.strip()))
+    if not names:
+        return {'message': 'Give at least one item name'}, 400
+    if len(names) > MAX_LOOKUP_NAMES:
+        return {'message': 'Cannot look up more than {} items at once'.format(MAX_LOOKUP_NAMES)}, 400
+    fields = fields_arg(ItemModel.JSON_FIELDS)
 
-        return item.json()
+    def load():
+        found = ItemModel.find_json_by_names(names, fields)
+        return {'items': [found[name] for name in names if name in found],
+                'missing': [name for name in names if name not in found]}, [('items',)]
+
+    return cached_get(('lookup', tuple(names), fields), load)
 
 
 class ItemList(Resource):
+    names_parser = reqparse.RequestParser()
+    names_parser.add_argument('names', type=str, location='args', help="Names must be a comma separated list")
+
+    @jwt_optional
+    def get(self):
+        names = ItemList.names_parser.parse_args()['names']
+        if names is not None:
+            verify_jwt_in_request()  # ?names= returns full items, so it needs a token just like Item.get
+            return lookup(names.split(','))
+
+        user_id = get_jwt_identity()
+        after, limit = page_args()
+        fields = fields_arg(ItemModel.JSON_FIELDS) if user_id else ('name',)  # anonymous callers only ever see names
+
+        def load():
+            items, next_cursor = ItemModel.find_page_json(after, limit, fields)
+            if user_id:
+                return page_response('items', items, next_cursor), [('items',)]
+            return page_response('item', [item['name'] for item in items], next_cursor,
+                                 message='More data available if you log in'), [('items',)]
+
+        return cached_get(('items', bool(user_id), after, limit, fields), load)
+
+
+class ItemLookup(Resource):
+    @jwt_required
+    def post(self):
+        body = request.get_json(silent=True)
+        names = body.get('names') if isinstance(body, dict) else body
+        if not isinstance(names, list):
+            return {'message': 'Request body must be a list of item names'}, 400
+        return lookup(names)
+
+
+class ItemSearch(Resource):
+    parser = reqparse.RequestParser()
+    parser.add_argument('q', type=str, location='args', default='')
+    parser.add_argument('min_price', type=float, location='args', help="Minimum price must be a number")
+    parser.add_argument('max_price', type=float, location='args', help="Maximum price must be a number")
+    parser.add_argument('store_id', type=int, location='args', help="Store ID must be a whole number")
+
     @jwt_optional
     def get(self):
         user_id = get_jwt_identity()
-        items = [item.json() for item in ItemModel.find_all()]
-
-        if user_id:
-            return {'items': items}, 200
-        return {
-            'item': [item['name'] for item in items],
-            'message': 'More data available if you log in'
-        }, 200
+        args = ItemSearch.parser.parse_args()
+        offset, limit = page_args()
+        fields = fields_arg(ItemModel.JSON_FIELDS) if user_id else ('name',)  # the same rule as ItemList
+
+        def load():
+            items, next_cursor = ItemModel.search(args['q'], args['min_price'], args['max_price'], args['store_id'],
+                                                  offset or 0, limit, fields)
+            if user_id:
+                return page_response('items', items, next_cursor), [('items',)]
+            return page_response('item', [item['name'] for item in items], next_cursor,
+                                 message='More data available if you log in'), [('items',)]
+
+        key = ('search', bool(user_id), args['q'], args['min_price'], args['max_price'], args['store_id'], offset,
+               limit, fields)
+        return cached_get(key, load)
+
+
+class ItemBatch(Resource):
+    fields = (
+        ('name', str, "Item name cannot be empty"),
+        ('price', float, "This field cannot be empty"),
+        ('store_id', int, "Store ID cannot be empty"),
+    )
+
+    @classmethod
+    def validate(cls, entries):
+        """Check every entry up front so that a bad row rejects the whole batch before anything is written."""
+        rows = []
+        errors = {}
+        seen = set()
+
+        for index, entry in enumerate(entries):
+            if not isinstance(entry, dict):
+                errors[str(index)] = 'Each item must be an object'
+                continue
+
+            row = {}
+            for field, type_, help_message in cls.fields:
+                try:
+                    if entry.get(field) is None:
+                        raise ValueError()
+                    row[field] = type_(entry[field])
+                except (TypeError, ValueError):
+                    errors.setdefault(str(index), {})[field] = help_message
+
+            if 'name' in row:
+                if row['name'] in seen:
+                    errors.setdefault(str(index), {})['name'] = "Item '{}' appears more than once".format(row['name'])
+                seen.add(row['name'])
+            rows.append(row)
+
+        return rows, errors
+
+    def post(self):
+        entries = request.get_json(silent=True)
+        if isinstance(entries, dict):
+            entries = entries.get('items')
+        if not isinstance(entries, list) or not entries:
+            return {'message': 'Request body must be a non-empty list of items'}, 400
+        if len(entries) > MAX_BATCH_SIZE:
+            return {'message': 'A batch cannot contain more than {} items'.format(MAX_BATCH_SIZE)}, 400
+
+        rows, errors = ItemBatch.validate(entries)
+        if errors:
+            return {'message': errors}, 400
+
+        try:
+            results = ItemModel.upsert_many(rows)
+        except:
+            return {"message": "An error occurred whilst inserting the items"}, 500
+
+        return {'items': [
+            {'status': 'created' if created else 'updated', 'item': item} for item, created in results
+        ]}, 200
+
+
+class ItemExport(Resource):
+    @jwt_required
+    def get(self):
+        def generate():
+            for item in ItemModel.iter_json():
+                yield json.dumps(item) + '\n'
+
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
@@ -0,0 +1,10 @@
+from flask import Response
+from flask_restful import Resource
+
+from metrics import metrics
+
+
+class Metrics(Resource):
+
+    def get(self):
+        return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -1,31 +1,39 @@
-from flask_restful import Resource, reqparse
+from flask_restful import Resource
 from flask_jwt import jwt_required
+from conditional import cached_get
+from fieldsets import fields_arg
 from models.store import StoreModel
+from models.store_stats import StoreStatsModel
+from pagination import page_args, page_response
+from schema import Schema
 
 
 class Store(Resource):
-    parser = reqparse.RequestParser()
-    parser.add_argument('name',
-                        type=str,
-                        required=True,
-                        help="Store name cannot be empty"
-                        )
+    schema = Schema(
+        ('name', str, "Store name cannot be empty"),
+    )
 
     def get(self, name):
+        fields = fields_arg(StoreModel.JSON_FIELDS)
+
+        def load():
+            store = StoreModel.find_row_by_name(name, fields)
+            if store:
+                return StoreModel.json_many([store], fields)[0], [('store', name), ('store_id', store.id)]
+
         try:
-            store = StoreModel.find_by_name(name)
+            response = cached_get(('store', name, fields), load)
         except:
             return {"message": "An error occurred whilst looking up the store"}, 500
 
-        if store:
-            return store.json()
+        if response is not None:
+            return response
         return {'message': 'Store not found'}, 404
 
     def post(self, name):
         if StoreModel.find_by_name(name):
             return {'message': "A store with name '{}' already exists.".format(name)}, 400
 
-        # data = Store.parser.parse_args()
         store = StoreModel(name)
 
         try:
@@ -47,6 +55,35 @@ class Store(Resource):
 
 class StoreList(Resource):
     def get(self):
-        return {'stores': [store.json() for store in StoreModel.query.all()]}
-        # alternatively, {'stores': list(map(lambda x: x.json(), StoreModel.query.all()))}
+        after, limit = page_args()
+        fields = fields_arg(StoreModel.JSON_FIELDS)
+
+        def load():
+            stores, next_cursor = StoreModel.find_page_json(after, limit, fields)
+            return page_response('stores', stores, next_cursor), [('stores',)]
+
+        return cached_get(('stores', after, limit, fields), load)
+
+
+class StoreStats(Resource):
+    def get(self, name):
+        def load():
+            stats = StoreStatsModel.find_json_by_name(name)
+            if stats:
+                return stats, [('store', name), ('store_id', stats['id'])]
+
+        response = cached_get(('store_stats', name), load)
+        if response is not None:
+            return response
+        return {'message': 'Store not found'}, 404
+
+
+class StoreStatsList(Resource):
+    def get(self):
+        after, limit = page_args()
+
+        def load():
+            stats, next_cursor = StoreStatsModel.find_page_json(after, limit)
+            return page_response('stores', stats, next_cursor), [('stores',)]
 
+        return cached_get(('store_stats', after, limit), load)
@@ -1,27 +1,23 @@
 from flask_jwt_extended import create_access_token, create_refresh_token, jwt_refresh_token_required, get_jwt_identity, \
     fresh_jwt_required, jwt_required, get_raw_jwt
-from flask_restful import Resource, reqparse
+from flask_restful import Resource
 from werkzeug.security import safe_str_cmp
 
 from blocklist import BLOCKLIST
+from fieldsets import fields_arg
 from models.user import UserModel
+from pagination import page_args, page_response
+from schema import Schema
 
-_user_parser = reqparse.RequestParser()
-_user_parser.add_argument('username',
-                          type=str,
-                          required=True,
-                          help="This field cannot be empty"
-                          )
-_user_parser.add_argument('password',
-                          type=str,
-                          required=True,
-                          help="This field cannot be empty"
-                          )
+_user_schema = Schema(
+    ('username', str, "This field cannot be empty"),
+    ('password', str, "This field cannot be empty"),
+)
 
 
 class UserRegister(Resource):
     def post(self):
-        data = _user_parser.parse_args()
+        data = _user_schema.parse()
 
         if UserModel.find_by_username(data['username']):
             return {"message": "User already exists."}, 400
@@ -35,10 +31,10 @@ class UserRegister(Resource):
 class User(Resource):
     @classmethod
     def get(cls, user_id):
-        user = UserModel.find_by_id(user_id)
+        user = UserModel.find_json_by_id(user_id, fields_arg(UserModel.JSON_FIELDS))
         if not user:
             return {'message': 'User {} not found'.format(user_id)}, 404
-        return user.json()
+        return user
 
     @classmethod
     @fresh_jwt_required
@@ -50,32 +46,29 @@ class User(Resource):
         return {'message': 'User {} deleted'.format(user_id)}, 200
 
     def put(self, user_id):
-        data = _user_parser.parse_args()
+        data = _user_schema.parse()
 
         try:
-            user = UserModel.find_by_id(user_id)
+            user = UserModel.upsert_password(user_id, data['username'], data['password'])
         except:
-            return {"message": "An error occurred whilst searching for the user"}, 500
-
-        if user:
-            user.password = data['password']
-        else:
-            user = UserModel(data['username'], data['password'])
-
-        user.upsert()
+            return {"message": "An error occurred whilst updating the user"}, 500
 
-        return user.json()
+        if user is None:
+            return {"message": "User '{}' already exists with a different id.".format(data['username'])}, 409
+        return user
 
 
 class UserList(Resource):
     def get(self):
-        return {'users': [user.json() for user in UserModel.query.all()]}
+        after, limit = page_args()
+        users, next_cursor = UserModel.find_page_json(after, limit, fields_arg(UserModel.JSON_FIELDS))
+        return page_response('users', users, next_cursor)
 
 
 class UserLogin(Resource):
     @classmethod
     def post(cls):
-        data = _user_parser.parse_args()
+        data = _user_schema.parse()
 
         user = UserModel.find_by_username(data['username'])
 
@@ -92,8 +85,8 @@ class UserLogin(Resource):
 class UserLogout(Resource):
     @jwt_required
     def post(self):
-        jti = get_raw_jwt()['jti']  # jti is JWT ID, a unique identifier for a JWT
-        BLOCKLIST.add(jti)
+        raw_jwt = get_raw_jwt()
+        BLOCKLIST.add(raw_jwt['jti'], raw_jwt.get('exp'))  # jti is JWT ID, a unique identifier for a JWT
         return {'message': 'Successfully logged out.'}, 200
 
 
@@ -0,0 +1,55 @@
+"""
+JSON output representation for the Api.
+
+Large list payloads (/items, /stores, ...) are encoded with orjson when it is installed. It keeps
+key order and writes the same shortest round-trip float text as the stdlib encoder, except below
+1e-4 where it avoids exponents (0.000025 vs 2.5e-05), and NaN and infinities, which it writes as
+null where the stdlib writes NaN and Infinity; output that may contain either is re-encoded with
+the stdlib. Everything else, debug mode and any RESTFUL_JSON settings go through
+flask_restful's stdlib encoder unchanged, so small responses stay byte-for-byte what they were.
+"""
+import math
+
+from flask import current_app, make_response
+from flask_restful.representations.json import output_json as stdlib_output_json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+FAST_MIN_ITEMS = 50  # below this a response encodes in microseconds either way
+
+
+def is_large(data):
+    return isinstance(data, dict) and any(isinstance(value, list) and len(value) >= FAST_MIN_ITEMS
+                                          for value in data.values())
+
+
+def needs_stdlib(value):
+    """Whether value holds a float that orjson writes differently: NaN, an infinity or a non-zero below 1e-4."""
+    if isinstance(value, float):
+        return not math.isfinite(value) or 0 < abs(value) < 1e-4
+    if isinstance(value, dict):
+        return any(needs_stdlib(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return any(needs_stdlib(item) for item in value)
+    return False
+
+
+def output_json(data, code, headers=None):
+    if orjson is None or current_app.debug or current_app.config.get('RESTFUL_JSON') or not is_large(data):
+        return stdlib_output_json(data, code, headers)
+
+    try:
+        dumped = orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE)
+    except TypeError:  # orjson.JSONEncodeError, e.g. integers wider than 64 bits
+        return stdlib_output_json(data, code, headers)
+    # the bytes only say such a float may be there (or a None, or a string like 'store-1'), the data says if it is
+    if (b'e-' in dumped or b'0.0000' in dumped or b'null' in dumped) and needs_stdlib(data):
+        return stdlib_output_json(data, code, headers)
+
+    resp = make_response(dumped, code)
+    resp.headers.extend(headers or {})
+    resp.mimetype = 'application/json'
+    return resp
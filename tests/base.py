@@ -0,0 +1,43 @@
+import os
+import tempfile
+import unittest
+
+import migrations
+from app import app, db
+from blocklist import BLOCKLIST
+from cache import response_cache
+from changes import change_feed
+from ratelimit import limiter
+from token_cache import token_cache
+
+
+class AppTestCase(unittest.TestCase):
+    """
+    Runs the real app through Flask's test client against a throwaway database
+    """
+
+    def setUp(self):
+        self.db_dir = tempfile.TemporaryDirectory()
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(self.db_dir.name, 'data.db')
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        self.context = app.app_context()
+        self.context.push()
+        migrations.upgrade(db.engine)
+        BLOCKLIST.clear()
+        response_cache.clear()
+        token_cache.clear()
+        limiter.clear()
+        change_feed.clear()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        db.engine.dispose()
+        self.context.pop()
+        self.db_dir.cleanup()
+
+    def register_and_login(self, username='user1', password='abc'):
+        self.client.post('/register', json={'username': username, 'password': password})
+        r = self.client.post('/login', json={'username': username, 'password': password})
+        return {'Authorization': 'Bearer {}'.format(r.get_json()['access_token'])}
@@ -0,0 +1,65 @@
+import time
+import unittest
+from unittest import mock
+
+from blocklist import Blocklist
+from db import db
+from models.revoked_token import RevokedTokenModel
+from tests.base import AppTestCase
+
+
+class BlocklistTests(AppTestCase):
+
+    def test_logout_revokes_token(self):
+        headers = self.register_and_login()
+        self.assertEqual(self.client.get('/item/missing', headers=headers).status_code, 404)
+
+        r = self.client.post('/logout', headers=headers)
+        self.assertEqual(r.status_code, 200)
+
+        r = self.client.get('/item/missing', headers=headers)
+        self.assertEqual(r.status_code, 401)
+        self.assertEqual(r.get_json(), {
+            'description': 'The supplied token has been revoked.',
+            'error': 'token_revoked'
+        })
+
+    def test_revocation_visible_to_other_workers(self):
+        worker_a = Blocklist()
+        worker_b = Blocklist(sync_interval=0)
+        self.assertNotIn('abc', worker_b)
+
+        worker_a.add('abc', int(time.time()) + 60)
+        self.assertIn('abc', worker_b)
+        self.assertIn('abc', Blocklist())  # survives a restart
+
+    def test_expired_entries_are_evicted(self):
+        worker_a = Blocklist()
+        worker_a.add('old', int(time.time()) - 1)
+        worker_a.add('new', int(time.time()) + 60)
+        self.assertEqual([token.jti for token in RevokedTokenModel.find_since(0, int(time.time()))], ['new'])
+
+        worker_b = Blocklist()
+        self.assertNotIn('old', worker_b)
+        self.assertEqual(len(worker_b), 1)
+
+    def test_lower_id_committed_late_is_seen_off_sqlite(self):
+        # a PostgreSQL sequence can commit id 1 after id 2 has already been synced
+        now = int(time.time())
+        worker = Blocklist(sync_interval=0)
+        RevokedTokenModel('late', now + 60).save_to_db()
+        RevokedTokenModel('early', now + 60).save_to_db()
+        RevokedTokenModel.query.filter_by(jti='late').delete()
+        db.session.commit()
+        self.assertIn('early', worker)
+
+        db.session.execute(RevokedTokenModel.__table__.insert().values(id=1, jti='late', expires_at=now + 60))
+        db.session.commit()
+        self.assertNotIn('late', worker)  # SQLite never does this, so it only reads past the last id
+
+        with mock.patch.object(db.engine.dialect, 'name', 'postgresql'):
+            self.assertIn('late', worker)
+
+
+if __name__ == '__main__':
+    unittest.main()
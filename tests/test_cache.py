@@ -0,0 +1,58 @@
+import unittest
+
+from cache import ResponseCache, response_cache
+from tests.base import AppTestCase
+
+
+class ResponseCacheTests(unittest.TestCase):
+
+    def test_lru_eviction_by_size(self):
+        cache = ResponseCache(max_bytes=40)
+        cache.set('a', {'v': 'x' * 10})
+        cache.set('b', {'v': 'y' * 10})
+        cache.get('a')
+        cache.set('c', {'v': 'z' * 10})
+
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), {'v': 'x' * 10})
+        self.assertEqual(cache.stats()['evictions'], 1)
+        self.assertLessEqual(cache.stats()['bytes'], 40)
+
+    def test_invalidate_by_tag(self):
+        cache = ResponseCache()
+        cache.set('store1', {}, tags=[('store_id', 1), ('stores',)])
+        cache.set('store2', {}, tags=[('store_id', 2), ('stores',)])
+        cache.invalidate(('store_id', 1))
+
+        self.assertIsNone(cache.get('store1'))
+        self.assertEqual(cache.get('store2'), {})
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+
+class CachedResourceTests(AppTestCase):
+
+    def test_item_write_invalidates_store(self):
+        self.client.post('/store/store1')
+        self.client.post('/item/chair', json={'price': 9.99, 'store_id': 1})
+        self.assertEqual(len(self.client.get('/store/store1').get_json()['items']), 1)
+        self.assertEqual(response_cache.stats()['entries'], 1)
+
+        self.client.put('/item/chair', json={'price': 5.0, 'store_id': 1})
+        self.assertEqual(self.client.get('/store/store1').get_json()['items'][0]['price'], 5.0)
+        self.assertEqual(self.client.get('/stores').get_json()['stores'][0]['items'][0]['price'], 5.0)
+
+        headers = self.register_and_login()
+        self.client.delete('/item/chair', headers=headers)
+        self.assertEqual(self.client.get('/store/store1').get_json()['items'], [])
+
+    def test_stats_endpoint(self):
+        self.client.get('/items')
+        self.client.get('/items')
+        r = self.client.get('/cache/stats')
+        self.assertEqual(r.get_json()['hits'], 1)
+        self.assertEqual(r.get_json()['misses'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,164 @@
+import json
+import threading
+import unittest
+
+from app import app, db
+from changes import ChangeFeed, change_feed, publish_on_commit
+from models.item import ItemModel
+from models.store import StoreModel
+from tests.base import AppTestCase
+
+
+def parse(text):
+    """[(id, event, data)] for every event in an SSE body, skipping retry and comment lines."""
+    events = []
+    for block in text.split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.splitlines() if line and not line.startswith(':'))
+        if 'event' in fields:
+            events.append((int(fields['id']), fields['event'], fields['data']))
+    return events
+
+
+class ChangeFeedTests(unittest.TestCase):
+
+    def test_ring_buffer_resume_and_reset(self):
+        feed = ChangeFeed(capacity=3)
+        for i in range(5):
+            feed.publish('item', 'updated', {'id': i})
+
+        events, last_id = feed.wait(3, timeout=0)
+        self.assertEqual(([seq for seq, _, _ in parse(''.join(events))], last_id), ([4, 5], 5))
+        self.assertEqual(feed.wait(5, timeout=0), ([], 5))
+
+        for stale in (1, 9):
+            events, last_id = feed.wait(stale, timeout=0)
+            self.assertEqual([event for _, event, _ in parse(''.join(events))], ['reset'])
+            self.assertEqual(last_id, 5)
+
+    def test_events_are_released_in_reserved_order(self):
+        feed = ChangeFeed()
+        first, second = feed.reserve(), feed.reserve()
+        feed.publish('item', 'updated', {'id': 2}, second)  # committed second, published first
+        self.assertEqual(feed.wait(0, timeout=0), ([], 0))
+
+        feed.publish('item', 'updated', {'id': 1}, first)
+        events, last_id = feed.wait(0, timeout=0)
+        self.assertEqual([seq for seq, _, _ in parse(''.join(events))], [1, 2])
+
+        cancelled = feed.reserve()
+        feed.publish('item', 'deleted', {'id': 1})
+        self.assertEqual(feed.wait(last_id, timeout=0), ([], 2))
+        feed.cancel(cancelled)
+        events, last_id = feed.wait(2, timeout=0)
+        self.assertEqual(([seq for seq, _, _ in parse(''.join(events))], last_id), ([4], 4))
+
+    def test_one_publish_wakes_every_subscriber(self):
+        feed = ChangeFeed()
+        received = []
+
+        def subscribe():
+            received.append(feed.wait(0, timeout=5)[0])
+
+        threads = [threading.Thread(target=subscribe) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        feed.publish('store', 'created', {'id': 1, 'name': 'store1'})
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(received), 5)
+        self.assertTrue(all(events[0] is received[0][0] for events in received))  # encoded once, shared
+
+
+class ChangesEndpointTests(AppTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.headers = self.register_and_login()
+
+    def changes(self, last_event_id=0):
+        headers = dict(self.headers, **{'Last-Event-ID': str(last_event_id)})
+        r = self.client.get('/changes?follow=false', headers=headers)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.mimetype, 'text/event-stream')
+        return parse(r.get_data(as_text=True))
+
+    def test_write_paths_publish_events(self):
+        self.client.post('/store/store1')
+        self.client.post('/item/chair', json={'price': 5.0, 'store_id': 1})
+        self.client.put('/item/chair', json={'price': 6.0, 'store_id': 1})
+        self.client.put('/item/desk', json={'price': 9.0, 'store_id': 1})
+        self.client.post('/items/batch', json=[{'name': 'desk', 'price': 8.0, 'store_id': 1}])
+        self.client.delete('/item/chair', headers=self.headers)
+        self.client.delete('/store/store1')
+
+        events = self.changes()
+        self.assertEqual([(seq, event) for seq, event, _ in events], [
+            (1, 'store.created'), (2, 'item.created'), (3, 'item.updated'), (4, 'item.created'),
+            (5, 'item.updated'), (6, 'item.deleted'), (7, 'store.deleted'),
+        ])
+        self.assertEqual(json.loads(events[2][2]), {'id': 1, 'name': 'chair', 'price': 6.0, 'store_id': 1})
+        self.assertEqual([seq for seq, _, _ in self.changes(5)], [6, 7])
+
+    def test_rolled_back_write_is_not_published(self):
+        db.session.add(StoreModel('store1'))
+        publish_on_commit(db.session, ('store', 'created', {'id': 1, 'name': 'store1'}))
+        db.session.rollback()
+        StoreModel('store2').upsert()
+
+        self.assertEqual([(seq, event, json.loads(data)) for seq, event, data in self.changes()],
+                         [(2, 'store.created', {'id': 1, 'name': 'store2'})])
+
+    def test_query_parameter_resume(self):
+        StoreModel('store1').upsert()
+        ItemModel('chair', 5.0, 1).upsert()
+        r = self.client.get('/changes?follow=false&last_event_id=1', headers=self.headers)
+        self.assertEqual([event for _, event, _ in parse(r.get_data(as_text=True))], ['item.created'])
+
+    def test_live_stream(self):
+        app.config['CHANGES_HEARTBEAT_SECONDS'] = 0.05
+        try:
+            r = self.client.get('/changes', headers=self.headers, buffered=False)
+            chunks = iter(r.response)
+            self.assertEqual(next(chunks), b'retry: 3000\n\n')
+            self.assertEqual(next(chunks), b': keep-alive\n\n')
+            change_feed.publish('store', 'created', {'id': 1, 'name': 'store1'})
+            chunk = next(chunks)
+            while chunk.startswith(b':'):
+                chunk = next(chunks)
+            self.assertEqual(parse(chunk.decode()), [(1, 'store.created', '{"id": 1, "name": "store1"}')])
+            r.close()
+        finally:
+            app.config.pop('CHANGES_HEARTBEAT_SECONDS')
+
+    def test_open_streams_hold_no_connections(self):
+        app.config['CHANGES_HEARTBEAT_SECONDS'] = 0.05
+        checked_out = db.engine.pool.checkedout()
+        connected, stop = threading.Barrier(6), threading.Event()
+
+        def subscribe():
+            r = app.test_client().get('/changes', headers=self.headers, buffered=False)
+            chunks = iter(r.response)
+            next(chunks)
+            next(chunks)
+            connected.wait()
+            stop.wait()
+            r.close()
+
+        threads = [threading.Thread(target=subscribe) for _ in range(5)]
+        try:
+            for thread in threads:
+                thread.start()
+            connected.wait(timeout=5)
+            self.assertEqual(db.engine.pool.checkedout(), checked_out)
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+            app.config.pop('CHANGES_HEARTBEAT_SECONDS')
+
+    def test_requires_token(self):
+        self.assertEqual(self.client.get('/changes').status_code, 401)
+
+
+if __name__ == '__main__':
+    unittest.main()
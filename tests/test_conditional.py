@@ -0,0 +1,53 @@
+import unittest
+
+from tests.base import AppTestCase
+
+
+class ConditionalGetTests(AppTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.post('/store/store1')
+        self.client.post('/item/chair', json={'price': 9.99, 'store_id': 1})
+
+    def test_unchanged_store_is_not_modified(self):
+        r = self.client.get('/store/store1')
+        etag = r.headers['ETag']
+        self.assertTrue(etag.startswith('"'))
+
+        r = self.client.get('/store/store1', headers={'If-None-Match': etag})
+        self.assertEqual(r.status_code, 304)
+        self.assertEqual(r.data, b'')
+        self.assertEqual(r.headers['ETag'], etag)
+
+    def test_write_changes_etag(self):
+        etag = self.client.get('/items').headers['ETag']
+        self.client.put('/item/chair', json={'price': 5.0, 'store_id': 1})
+
+        r = self.client.get('/items', headers={'If-None-Match': etag})
+        self.assertEqual(r.status_code, 200)
+        self.assertNotEqual(r.headers['ETag'], etag)
+
+    def test_etag_depends_on_view(self):
+        anonymous = self.client.get('/items').headers['ETag']
+        headers = self.register_and_login()
+        headers['If-None-Match'] = anonymous
+        r = self.client.get('/items', headers=headers)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.get_json()['items'][0]['name'], 'chair')
+
+    def test_item_requires_jwt_before_etag(self):
+        headers = self.register_and_login()
+        etag = self.client.get('/item/chair', headers=headers).headers['ETag']
+        r = self.client.get('/item/chair', headers={'If-None-Match': etag})
+        self.assertEqual(r.status_code, 401)
+
+    def test_missing_item_has_no_etag(self):
+        headers = self.register_and_login()
+        r = self.client.get('/item/table', headers=headers)
+        self.assertEqual(r.status_code, 404)
+        self.assertNotIn('ETag', r.headers)
+
+
+if __name__ == '__main__':
+    unittest.main()
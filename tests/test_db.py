@@ -0,0 +1,35 @@
+import unittest
+
+from db import db, engine_options
+from tests.base import AppTestCase
+
+
+class EngineOptionsTests(unittest.TestCase):
+
+    def test_postgres_gets_plain_pool(self):
+        options = engine_options('postgresql://localhost/store', pool_size=5)
+        self.assertEqual(options['pool_size'], 5)
+        self.assertNotIn('sqlite_pragmas', options)
+
+    def test_memory_sqlite_left_to_flask_sqlalchemy(self):
+        self.assertEqual(engine_options('sqlite://'), {})
+
+
+class SqliteProfileTests(AppTestCase):
+
+    def pragma(self, name):
+        with db.engine.connect() as connection:
+            return connection.exec_driver_sql('PRAGMA {}'.format(name)).scalar()
+
+    def test_pragmas_applied_to_new_connections(self):
+        self.assertEqual(self.pragma('journal_mode'), 'wal')
+        self.assertEqual(self.pragma('synchronous'), 1)  # NORMAL
+        self.assertEqual(self.pragma('busy_timeout'), 5000)
+        self.assertEqual(self.pragma('cache_size'), -64 * 1024)
+
+    def test_connections_are_pooled(self):
+        self.assertEqual(type(db.engine.pool).__name__, 'QueuePool')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+
+from sqlalchemy import event
+
+from db import db
+from tests.base import AppTestCase
+
+
+class FieldsetTests(AppTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.post('/store/store1')
+        self.client.post('/item/chair', json={'price': 9.99, 'store_id': 1})
+        self.headers = self.register_and_login()
+
+    def test_items_projection(self):
+        r = self.client.get('/items?fields=price,name', headers=self.headers)
+        self.assertEqual(r.get_json(), {'items': [{'name': 'chair', 'price': 9.99}]})
+
+        r = self.client.get('/item/chair?fields=price', headers=self.headers)
+        self.assertEqual(r.get_json(), {'price': 9.99})
+
+    def test_stores_projection(self):
+        self.assertEqual(self.client.get('/stores?fields=name').get_json(), {'stores': [{'name': 'store1'}]})
+        self.assertEqual(self.client.get('/store/store1?fields=items').get_json(),
+                         {'items': [{'id': 1, 'name': 'chair', 'price': 9.99, 'store_id': 1}]})
+
+    def test_users_projection(self):
+        self.assertEqual(self.client.get('/users?fields=username').get_json(), {'users': [{'username': 'user1'}]})
+        self.assertEqual(self.client.get('/user/1?fields=id').get_json(), {'id': 1})
+
+    def test_empty_fields_returns_every_field(self):
+        for query in ('?fields=', '?fields=,', '?fields=%20', '?fields=%20,%20'):
+            with self.subTest(query=query):
+                r = self.client.get('/items' + query, headers=self.headers)
+                self.assertEqual(r.get_json(), {'items': [{'id': 1, 'name': 'chair', 'price': 9.99, 'store_id': 1}]})
+                self.assertEqual(self.client.get('/user/1' + query).get_json(), {'id': 1, 'username': 'user1'})
+
+    def test_unknown_field(self):
+        r = self.client.get('/items?fields=name,password', headers=self.headers)
+        self.assertEqual(r.status_code, 400)
+        self.assertEqual(r.get_json(), {'message': 'Unknown field(s) password, choose from id, name, price, store_id'})
+
+    def test_anonymous_listing_reads_only_names(self):
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            r = self.client.get('/items')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+        self.assertEqual(r.get_json()['item'], ['chair'])
+        listing = [statement for statement in statements if 'FROM items' in statement]
+        self.assertEqual(len(listing), 1)
+        self.assertNotIn('price', listing[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import threading
+import time
+import unittest
+from concurrent.futures import TimeoutError
+from unittest import mock
+
+from app import app
+from changes import change_feed
+from db import db
+from group_commit import committer, write
+from metrics import metrics
+from models.item import ItemModel
+from models.store import StoreModel
+from tests.base import AppTestCase
+
+
+def commits(mode):
+    counters, _ = metrics.snapshot()
+    return counters.get(('write_commits_total', (('mode', mode),)), 0)
+
+
+class GroupCommitTests(AppTestCase):
+
+    def setUp(self):
+        super().setUp()
+        app.config['GROUP_COMMIT'] = True
+        app.config['GROUP_COMMIT_WINDOW_MS'] = 50
+
+    def tearDown(self):
+        app.config['GROUP_COMMIT'] = False
+        app.config.pop('GROUP_COMMIT_WINDOW_MS', None)
+        app.config.pop('GROUP_COMMIT_TIMEOUT', None)
+        super().tearDown()
+
+    def test_concurrent_writes_share_a_commit(self):
+        before = commits('group')
+        statuses = []
+
+        def post(i):
+            statuses.append(app.test_client().post('/store/store{}'.format(i)).status_code)
+
+        threads = [threading.Thread(target=post, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(statuses, [201] * 8)
+        self.assertEqual(StoreModel.query.count(), 8)
+        self.assertLess(commits('group') - before, 8)  # fewer commits than writes
+
+    def test_failing_unit_rolls_back_alone(self):
+        db.session.add(StoreModel('store1'))
+        db.session.commit()
+
+        def insert(name):
+            return lambda: db.session.execute(StoreModel.__table__.insert().values(name=name))
+
+        futures = [committer.submit(insert(name)) for name in ('store2', 'store1', 'store3')]
+        futures[0].result()
+        futures[2].result()
+        with self.assertRaises(Exception):
+            futures[1].result()
+        self.assertEqual(sorted(store.name for store in StoreModel.query.all()), ['store1', 'store2', 'store3'])
+
+    def test_committer_survives_a_failed_batch(self):
+        with mock.patch.object(app, 'app_context', side_effect=RuntimeError('no context')):
+            with self.assertRaises(RuntimeError):
+                write(lambda: db.session.add(StoreModel('store1')))
+        write(lambda: db.session.add(StoreModel('store2')))
+        self.assertEqual([store.name for store in StoreModel.query.all()], ['store2'])
+
+    def test_timed_out_write_is_skipped(self):
+        app.config['GROUP_COMMIT_WINDOW_MS'] = 0
+        app.config['GROUP_COMMIT_TIMEOUT'] = 0.05
+        ran, started = [], threading.Event()
+        slow = committer.submit(lambda: started.set() or time.sleep(0.3))
+        started.wait()  # so the next unit goes in the following batch
+        with self.assertRaises(TimeoutError):
+            write(lambda: ran.append(True))
+        slow.result()
+        write(lambda: None)  # queued behind the timed-out unit, so that has been skipped by now
+        self.assertEqual(ran, [])
+
+    def test_written_instance_is_usable_afterwards(self):
+        store = StoreModel('store1')
+        store.upsert()
+        ItemModel('chair', 5.0, store.id).upsert()
+        self.assertEqual(store.json(), {'id': 1, 'name': 'store1',
+                                        'items': [{'id': 1, 'name': 'chair', 'price': 5.0, 'store_id': 1}]})
+
+        item = ItemModel.find_by_name('chair')
+        item.delete_from_db()
+        self.assertIsNone(ItemModel.find_by_name('chair'))
+
+    def test_api_writes(self):
+        self.client.post('/store/store1')
+        self.assertEqual(self.client.put('/item/chair', json={'price': 5.0, 'store_id': 1}).get_json(),
+                         {'id': 1, 'name': 'chair', 'price': 5.0, 'store_id': 1})
+        r = self.client.post('/items/batch', json=[{'name': 'chair', 'price': 6.0, 'store_id': 1},
+                                                   {'name': 'desk', 'price': 9.0, 'store_id': 1}])
+        self.assertEqual([entry['status'] for entry in r.get_json()['items']], ['updated', 'created'])
+        self.assertEqual(change_feed.seq, 4)  # published once the committer's transaction committed
+        self.assertEqual(self.client.post('/register', json={'username': 'user1', 'password': 'abc'}).status_code,
+                         201)
+        self.assertEqual(self.client.put('/user/1', json={'username': 'user1', 'password': 'xyz'}).get_json(),
+                         {'id': 1, 'username': 'user1'})
+
+
+class DirectWriteTests(AppTestCase):
+
+    def test_direct_mode_commits_on_the_request_thread(self):
+        before = commits('direct'), commits('group')
+        self.assertEqual(write(lambda: db.session.add(StoreModel('store1')) or 'done'), 'done')
+        self.assertEqual((commits('direct'), commits('group')), (before[0] + 1, before[1]))
+        self.assertEqual(StoreModel.query.count(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
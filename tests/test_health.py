@@ -0,0 +1,67 @@
+import sqlite3
+import threading
+import unittest
+from unittest import mock
+
+from app import app
+from db import db
+from resources.health import HealthReady
+from tests.base import AppTestCase
+
+
+class HealthTests(AppTestCase):
+
+    def setUp(self):
+        super().setUp()
+        HealthReady._cached = None
+
+    def test_liveness(self):
+        for url in ('/health', '/health/live'):
+            r = self.client.get(url)
+            self.assertEqual(r.status_code, 200)
+            self.assertEqual(r.get_json(), {'message': 'ok'})
+
+    def test_ready(self):
+        r = self.client.get('/health/ready')
+        self.assertEqual(r.status_code, 200)
+        checks = r.get_json()['checks']
+        self.assertTrue(checks['database']['ok'])
+        self.assertIn('latency_ms', checks['database'])
+        self.assertEqual(checks['blocklist']['size'], 0)
+        self.assertEqual((checks['pool']['capacity'], checks['pool']['overflow']), (30, 0))
+
+    def test_busy_writer_does_not_fail_the_probe(self):
+        writer = sqlite3.connect(db.engine.url.database, isolation_level=None)
+        writer.execute('BEGIN IMMEDIATE')
+        try:
+            r = self.client.get('/health/ready')
+        finally:
+            writer.execute('ROLLBACK')
+            writer.close()
+        self.assertEqual(r.status_code, 200)
+
+    def test_stuck_database_is_not_ready(self):
+        app.config['HEALTH_PROBE_TIMEOUT'] = 0.1
+        stuck = threading.Event()
+        try:
+            with mock.patch('resources.health.probe_database', side_effect=lambda engine: stuck.wait(5)):
+                r = self.client.get('/health/ready')
+                HealthReady._cached = None
+                again = self.client.get('/health/ready')  # does not queue a second probe behind the first
+        finally:
+            stuck.set()
+            del app.config['HEALTH_PROBE_TIMEOUT']
+
+        self.assertEqual(r.status_code, 503)
+        self.assertEqual(r.get_json()['message'], 'degraded')
+        self.assertEqual(r.get_json()['checks']['database']['error'], 'timed out after 0.1s')
+        self.assertEqual(again.get_json()['checks']['database']['error'], 'the previous probe has not finished')
+
+    def test_results_are_cached(self):
+        first = self.client.get('/health/ready').get_json()
+        second = self.client.get('/health/ready').get_json()
+        self.assertEqual(first, second)  # latency_ms would differ if the database had been probed again
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+
+from sqlalchemy import event
+
+from db import db
+from models.item import ItemModel
+from tests.base import AppTestCase
+
+
+class ItemBatchTests(AppTestCase):
+
+    def test_create_and_update(self):
+        self.client.post('/item/chair', json={'price': 9.99, 'store_id': 1})
+
+        r = self.client.post('/items/batch', json=[
+            {'name': 'chair', 'price': 5.0, 'store_id': 2},
+            {'name': 'table', 'price': '20.5', 'store_id': 1},
+        ])
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.get_json(), {'items': [
+            {'status': 'updated', 'item': {'id': 1, 'name': 'chair', 'price': 5.0, 'store_id': 2}},
+            {'status': 'created', 'item': {'id': 2, 'name': 'table', 'price': 20.5, 'store_id': 1}},
+        ]})
+        self.assertEqual(len(ItemModel.find_all()), 2)
+
+    def test_invalid_entry_rejects_whole_batch(self):
+        r = self.client.post('/items/batch', json={'items': [
+            {'name': 'chair', 'price': 5.0, 'store_id': 1},
+            {'name': 'table', 'price': 'cheap'},
+            {'name': 'chair', 'price': 1.0, 'store_id': 1},
+        ]})
+        self.assertEqual(r.status_code, 400)
+        self.assertEqual(r.get_json(), {'message': {
+            '1': {'price': 'This field cannot be empty', 'store_id': 'Store ID cannot be empty'},
+            '2': {'name': "Item 'chair' appears more than once"},
+        }})
+        self.assertEqual(ItemModel.find_all(), [])
+
+    def test_empty_batch(self):
+        r = self.client.post('/items/batch', json=[])
+        self.assertEqual(r.status_code, 400)
+
+    def test_response_needs_no_reloads(self):
+        self.client.post('/items/batch', json=[{'name': 'item0', 'price': 1.0, 'store_id': 1}])
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement.split(None, 1)[0].upper())
+
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            rows = [{'name': 'item{}'.format(i), 'price': 2.0, 'store_id': 1} for i in range(20)]
+            r = self.client.post('/items/batch', json=rows)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+        self.assertEqual(len(r.get_json()['items']), 20)
+        self.assertEqual(statements.count('SELECT'), 1)  # find_by_names, not one refresh per item
+
+    def test_find_by_names_chunks(self):
+        rows = [{'name': 'item{}'.format(i), 'price': 1.0, 'store_id': 1} for i in range(1200)]
+        self.assertEqual(self.client.post('/items/batch', json=rows).status_code, 200)
+        self.assertEqual(len(ItemModel.find_by_names(row['name'] for row in rows)), 1200)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,34 @@
+import json
+import unittest
+
+from models import item as item_model
+from tests.base import AppTestCase
+
+
+class ItemExportTests(AppTestCase):
+
+    def test_export_streams_every_item(self):
+        rows = [{'name': 'item{}'.format(i), 'price': i + 0.5, 'store_id': 1} for i in range(25)]
+        self.client.post('/items/batch', json=rows)
+        headers = self.register_and_login()
+
+        chunk_size = item_model.EXPORT_CHUNK_SIZE
+        item_model.EXPORT_CHUNK_SIZE = 10
+        try:
+            r = self.client.get('/items/export', headers=headers, buffered=False)
+            self.assertTrue(r.is_streamed)
+            lines = r.get_data(as_text=True).splitlines()
+        finally:
+            item_model.EXPORT_CHUNK_SIZE = chunk_size
+
+        self.assertEqual(r.mimetype, 'application/x-ndjson')
+        self.assertEqual(len(lines), 25)
+        self.assertEqual(json.loads(lines[0]), {'id': 1, 'name': 'item0', 'price': 0.5, 'store_id': 1})
+        self.assertEqual(json.loads(lines[-1])['name'], 'item24')
+
+    def test_export_requires_login(self):
+        self.assertEqual(self.client.get('/items/export').status_code, 401)
+
+
+if __name__ == '__main__':
+    unittest.main()
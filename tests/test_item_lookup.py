@@ -0,0 +1,53 @@
+import unittest
+from unittest import mock
+
+from db import db
+from models import item as item_module
+from models.item import ItemModel
+from models.store import StoreModel
+from resources.item import MAX_LOOKUP_NAMES
+from tests.base import AppTestCase
+
+
+class ItemLookupTests(AppTestCase):
+
+    def setUp(self):
+        super().setUp()
+        db.session.add(StoreModel('store1'))
+        db.session.add_all([ItemModel('item{}'.format(i), float(i), 1) for i in range(5)])
+        db.session.commit()
+        self.headers = self.register_and_login()
+
+    def test_get_by_names(self):
+        r = self.client.get('/items?names=item3,nope,item1,item3', headers=self.headers)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.get_json(), {
+            'items': [{'id': 4, 'name': 'item3', 'price': 3.0, 'store_id': 1},
+                      {'id': 2, 'name': 'item1', 'price': 1.0, 'store_id': 1}],
+            'missing': ['nope'],
+        })
+
+    def test_post_with_fields(self):
+        r = self.client.post('/items/lookup?fields=price', json={'names': ['item2', 'gone']}, headers=self.headers)
+        self.assertEqual(r.get_json(), {'items': [{'price': 2.0}], 'missing': ['gone']})
+
+    def test_token_required(self):
+        self.assertEqual(self.client.get('/items?names=item1').status_code, 401)
+        self.assertEqual(self.client.post('/items/lookup', json=['item1']).status_code, 401)
+        self.assertIn('message', self.client.get('/items').get_json())  # the anonymous listing is unchanged
+
+    def test_chunked_queries(self):
+        with mock.patch.object(item_module, 'NAME_CHUNK_SIZE', 2):
+            r = self.client.post('/items/lookup', json=['item{}'.format(i) for i in range(6)], headers=self.headers)
+        self.assertEqual(len(r.get_json()['items']), 5)
+        self.assertEqual(r.get_json()['missing'], ['item5'])
+
+    def test_bad_requests(self):
+        too_many = ['item{}'.format(i) for i in range(MAX_LOOKUP_NAMES + 1)]
+        for body in ({'names': []}, {'names': 'item1'}, [' ', None], too_many):
+            self.assertEqual(self.client.post('/items/lookup', json=body, headers=self.headers).status_code, 400)
+        self.assertEqual(self.client.get('/items?names=,', headers=self.headers).status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import threading
+import unittest
+
+from metrics import Metrics
+from tests.base import AppTestCase
+
+
+class MetricsTests(unittest.TestCase):
+
+    def test_shards_are_merged(self):
+        metrics = Metrics()
+        metrics.counter('hits_total', 'Hits.')
+        metrics.histogram('latency_seconds', 'Latency.', (0.1, 1.0))
+
+        def record():
+            for _ in range(100):
+                metrics.inc('hits_total', (('route', 'a'),))
+                metrics.observe('latency_seconds', 0.5)
+
+        threads = [threading.Thread(target=record) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        text = metrics.render()
+        self.assertIn('hits_total{route="a"} 400', text)
+        self.assertIn('latency_seconds_bucket{le="0.1"} 0', text)
+        self.assertIn('latency_seconds_bucket{le="1.0"} 400', text)
+        self.assertIn('latency_seconds_bucket{le="+Inf"} 400', text)
+        self.assertIn('latency_seconds_count 400', text)
+
+    def test_exited_threads_are_folded(self):
+        metrics = Metrics()
+        metrics.counter('hits_total', 'Hits.')
+
+        for _ in range(20):  # one thread per request, as werkzeug's threaded server does
+            thread = threading.Thread(target=metrics.inc, args=('hits_total',))
+            thread.start()
+            thread.join()
+        metrics.inc('hits_total')
+
+        self.assertIn('hits_total 21', metrics.render())
+        self.assertEqual(len(metrics._shards), 1)  # only this thread's
+
+
+class MetricsEndpointTests(AppTestCase):
+
+    def test_request_and_jwt_metrics(self):
+        self.client.get('/health')
+        self.client.get('/item/chair')  # no token
+
+        r = self.client.get('/metrics')
+        self.assertEqual(r.status_code, 200)
+        self.assertTrue(r.content_type.startswith('text/plain'))
+        text = r.get_data(as_text=True)
+        self.assertIn('http_requests_total{resource="Health",method="GET",status="200"}', text)
+        self.assertIn('http_request_duration_seconds_bucket{resource="Item",method="GET",status="401",le="+Inf"}',
+                      text)
+        self.assertIn('jwt_errors_total{error="authorization_required"}', text)
+        self.assertIn('db_pool_checked_out', text)
+        self.assertIn('response_cache_hits_total', text)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from sqlalchemy import create_engine
+
+import migrations
+
+
+class MigrationTests(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Builds a database the way db.create_all() used to, before any migrations existed
+        """
+        self.db_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.db_dir.name, 'data.db')
+
+        connection = sqlite3.connect(self.path)
+        cursor = connection.cursor()
+        cursor.execute("create table stores (id integer primary key, name varchar(80))")
+        cursor.execute("create table items (id integer primary key, name varchar(80), price float, "
+                       "store_id integer references stores (id))")
+        cursor.execute("create table users (id integer primary key, username varchar(80), password varchar(80))")
+        cursor.execute("insert into stores values (1, 'store1')")
+        cursor.execute("insert into stores values (2, 'store1')")
+        cursor.execute("insert into items values (1, 'item1', 10.99, 1)")
+        cursor.execute("insert into items values (3, 'item2', 1.99, 2)")
+        cursor.execute("insert into users values (1, 'user1', 'abc')")
+        connection.commit()
+        connection.close()
+
+        self.engine = create_engine('sqlite:///' + self.path)
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.db_dir.cleanup()
+
+    def query(self, sql):
+        connection = sqlite3.connect(self.path)
+        try:
+            return connection.execute(sql).fetchall()
+        finally:
+            connection.close()
+
+    def execute(self, sql):
+        connection = sqlite3.connect(self.path)
+        try:
+            connection.execute(sql)
+            connection.commit()
+        finally:
+            connection.close()
+
+    def test_upgrade_in_place(self):
+        self.assertEqual(migrations.upgrade(self.engine), migrations.MIGRATIONS[-1].VERSION)
+
+        self.assertEqual(self.query("select id, name, price, store_id from items order by id"),
+                         [(1, 'item1', 10.99, 1), (3, 'item2', 1.99, 1)])
+        self.assertEqual(self.query("select id, name from stores"), [(1, 'store1')])
+        self.assertEqual(self.query("select username from users"), [('user1',)])
+
+        indexes = {row[1]: row[2] for row in self.query("pragma index_list(items)")}
+        self.assertEqual(indexes['ix_items_name'], 1)
+        self.assertEqual(indexes['ix_items_store_id'], 0)
+        self.assertIn('ix_stores_name', [row[1] for row in self.query("pragma index_list(stores)")])
+        self.assertIn('ix_users_username', [row[1] for row in self.query("pragma index_list(users)")])
+
+    def assertUpgradeStops(self, message):
+        with self.assertRaises(RuntimeError) as raised:
+            migrations.upgrade(self.engine)
+        self.assertIn(message, str(raised.exception))
+        self.assertEqual(self.query("select max(version) from schema_version"), [(1,)])
+        self.assertEqual(len(self.query("select * from stores")), 2)  # the store merge rolled back too
+
+    def test_duplicate_items_stop_the_upgrade(self):
+        self.execute("insert into items values (2, 'item1', 12.99, 1)")
+        self.assertUpgradeStops("items.name, these values are used more than once: 'item1' (ids 1, 2)")
+
+    def test_duplicate_users_stop_the_upgrade(self):
+        self.execute("insert into users values (2, 'user1', 'xyz')")
+        self.assertUpgradeStops("users.username, these values are used more than once: 'user1' (ids 1, 2)")
+        self.assertEqual(len(self.query("select * from users")), 2)
+
+    def test_existing_items_are_searchable(self):
+        migrations.upgrade(self.engine)
+        self.assertEqual(self.query("select rowid from items_fts where items_fts match 'item*' order by rowid"),
+                         [(1,), (3,)])
+        self.assertIn('ix_items_price', [row[1] for row in self.query("pragma index_list(items)")])
+
+    def test_existing_items_are_summarised(self):
+        migrations.upgrade(self.engine)
+        self.assertEqual(self.query("select * from store_stats"), [(1, 2, 2, 12.98, 1.99, 10.99)])
+        self.assertIn('ix_items_store_id_price', [row[1] for row in self.query("pragma index_list(items)")])
+
+    def test_upgrade_is_idempotent(self):
+        version = migrations.upgrade(self.engine)
+        self.assertEqual(migrations.upgrade(self.engine), version)
+        self.assertEqual(len(self.query("select * from schema_version")), len(migrations.MIGRATIONS))
+
+    def test_fresh_database(self):
+        os.remove(self.path)
+        migrations.upgrade(self.engine)
+        self.assertEqual(self.query("select count(*) from items"), [(0,)])
+
+
+if __name__ == '__main__':
+    unittest.main()
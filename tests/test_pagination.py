@@ -0,0 +1,74 @@
+import unittest
+
+from db import db
+from models.item import ItemModel
+from models.store import StoreModel
+from models.user import UserModel
+from pagination import MAX_PAGE_SIZE
+from tests.base import AppTestCase
+
+
+class PaginationTests(AppTestCase):
+
+    def populate_db(self, count):
+        for i in range(count):
+            db.session.add(StoreModel('store{}'.format(i)))
+            db.session.add(ItemModel('item{}'.format(i), 1.0 + i, i + 1))
+        db.session.commit()
+
+    def test_small_listing_has_no_cursor(self):
+        self.populate_db(2)
+        r = self.client.get('/stores')
+        self.assertEqual(r.status_code, 200)
+        self.assertNotIn('next', r.get_json())
+        self.assertEqual(len(r.get_json()['stores']), 2)
+
+    def test_walk_stores_with_cursor(self):
+        self.populate_db(5)
+        r = self.client.get('/stores?limit=2')
+        body = r.get_json()
+        self.assertEqual([s['name'] for s in body['stores']], ['store0', 'store1'])
+        self.assertEqual(body['stores'][0]['items'], [{'id': 1, 'name': 'item0', 'price': 1.0, 'store_id': 1}])
+        self.assertEqual(body['next'], 2)
+
+        r = self.client.get('/stores?limit=2&after=4')
+        body = r.get_json()
+        self.assertEqual([s['name'] for s in body['stores']], ['store4'])
+        self.assertNotIn('next', body)
+
+    def test_items_anonymous_and_authenticated(self):
+        self.populate_db(3)
+        r = self.client.get('/items?limit=2')
+        self.assertEqual(r.get_json(), {'item': ['item0', 'item1'],
+                                        'message': 'More data available if you log in',
+                                        'next': 2})
+
+        headers = self.register_and_login()
+        r = self.client.get('/items?limit=2&after=2', headers=headers)
+        self.assertEqual(r.get_json(), {'items': [{'id': 3, 'name': 'item2', 'price': 3.0, 'store_id': 3}]})
+
+    def test_users_page(self):
+        self.register_and_login('user1')
+        self.register_and_login('user2')
+        r = self.client.get('/users?limit=1')
+        self.assertEqual(r.get_json(), {'users': [{'id': 1, 'username': 'user1'}], 'next': 1})
+
+    def test_limit_is_capped(self):
+        self.populate_db(1)
+        r = self.client.get('/items?limit={}'.format(MAX_PAGE_SIZE * 10))
+        self.assertEqual(r.status_code, 200)
+
+    def test_core_rows_match_model_json(self):
+        self.populate_db(7)
+        self.register_and_login('user1')
+        for model in (ItemModel, StoreModel, UserModel):
+            rows, next_cursor = model.find_page(2, 3)
+            self.assertEqual(model.find_page_json(2, 3), ([row.json() for row in rows], next_cursor))
+
+    def test_bad_cursor(self):
+        r = self.client.get('/items?after=abc')
+        self.assertEqual(r.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
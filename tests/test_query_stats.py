@@ -0,0 +1,64 @@
+import json
+import unittest
+
+from flask import g
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+import query_stats
+from app import app, db
+from tests.base import AppTestCase
+
+
+class QueryStatsTests(AppTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.post('/store/store1')
+        self.client.post('/item/chair', json={'price': 9.99, 'store_id': 1})
+
+    def test_debug_headers(self):
+        app.debug = True
+        try:
+            r = self.client.get('/stores')
+        finally:
+            app.debug = False
+        self.assertEqual(r.headers['X-Query-Count'], '3')  # catalog version, stores page, their items
+        self.assertGreater(float(r.headers['X-Query-Time-Ms']), 0)
+
+    def test_no_headers_outside_debug(self):
+        self.assertNotIn('X-Query-Count', self.client.get('/stores').headers)
+
+    def test_request_log_line(self):
+        with self.assertLogs('query_stats', level='INFO') as logs:
+            self.client.get('/store/store1')
+        line = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(line['resource'], 'Store')
+        self.assertEqual(line['method'], 'GET')
+        self.assertEqual(line['query_count'], 3)
+        self.assertIn('SELECT', line['slowest_query'])
+
+    def test_slow_query_log(self):
+        app.config['SLOW_QUERY_THRESHOLD_MS'] = 0
+        try:
+            with self.assertLogs('query_stats.slow', level='WARNING') as logs:
+                self.client.put('/item/chair', json={'price': 5.0, 'store_id': 1})
+        finally:
+            app.config['SLOW_QUERY_THRESHOLD_MS'] = 100
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertEqual(entry['resource'], 'Item')
+        self.assertEqual(entry['method'], 'PUT')
+        self.assertIn('INSERT INTO items', entry['statement'])
+
+    def test_failed_statement_leaves_no_start_time(self):
+        with db.engine.connect() as connection, app.test_request_context('/stores'):
+            query_stats.start_request()
+            for _ in range(3):
+                with self.assertRaises(OperationalError):
+                    connection.execute(text('SELECT * FROM no_such_table'))
+            connection.execute(text('SELECT 1'))
+            self.assertEqual(connection.info.get('query_start_time', []), [])
+            self.assertEqual(g.query_stats['count'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
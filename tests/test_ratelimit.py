@@ -0,0 +1,91 @@
+import os
+import tempfile
+import unittest
+
+from app import app
+from ratelimit import DEFAULT_LIMITS, MemoryBuckets, SQLiteBuckets, limiter
+from tests.base import AppTestCase
+
+
+class BucketTests(unittest.TestCase):
+
+    def check_bucket(self, buckets):
+        self.assertEqual([buckets.take('k', 1, 2, now=100) for _ in range(2)], [0, 0])
+        self.assertAlmostEqual(buckets.take('k', 1, 2, now=100), 1)
+        self.assertAlmostEqual(buckets.take('k', 1, 2, now=100.5), 0.5)
+        self.assertEqual(buckets.take('k', 1, 2, now=101), 0)
+        self.assertEqual(buckets.take('other', 1, 2, now=101), 0)
+
+    def test_memory(self):
+        self.check_bucket(MemoryBuckets())
+
+    def test_sqlite_is_shared_between_instances(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'buckets.db')
+            self.check_bucket(SQLiteBuckets(path))
+            self.assertAlmostEqual(SQLiteBuckets(path).take('k', 1, 2, now=101), 1)
+
+    def test_sqlite_prunes_idle_buckets(self):
+        with tempfile.TemporaryDirectory() as directory:
+            buckets = SQLiteBuckets(os.path.join(directory, 'buckets.db'))
+            for i in range(5):
+                buckets.take('idle{}'.format(i), 1, 2, now=100)
+            buckets.take('active', 1, 2, now=100 + SQLiteBuckets.IDLE_SECONDS + 1)
+            keys = buckets._connection().execute('SELECT key FROM rate_buckets').fetchall()
+            self.assertEqual(keys, [('active',)])
+
+
+class RateLimitTests(AppTestCase):
+
+    def tearDown(self):
+        app.config.pop('RATELIMIT_LIMITS', None)
+        app.config.pop('MAX_CONCURRENT_REQUESTS', None)
+        limiter.clear()
+        super().tearDown()
+
+    def test_login_is_limited_per_ip(self):
+        self.client.post('/register', json={'username': 'user1', 'password': 'abc'})
+        burst = DEFAULT_LIMITS['UserLogin'][1]
+        for _ in range(burst):
+            r = self.client.post('/login', json={'username': 'user1', 'password': 'wrong'})
+            self.assertEqual(r.status_code, 401)
+
+        r = self.client.post('/login', json={'username': 'user1', 'password': 'abc'})
+        self.assertEqual(r.status_code, 429)
+        self.assertEqual(r.headers['Retry-After'], '6')
+        self.assertIn('Too many requests', r.get_json()['message'])
+
+        r = self.client.post('/login', json={'username': 'user1', 'password': 'abc'},
+                             environ_base={'REMOTE_ADDR': '10.0.0.2'})
+        self.assertEqual(r.status_code, 200)
+
+    def test_authenticated_clients_get_their_own_bucket(self):
+        app.config['RATELIMIT_LIMITS'] = {'ItemList': (1, 1)}
+        headers = self.register_and_login()
+        self.assertEqual(self.client.get('/items', headers=headers).status_code, 200)
+        self.assertEqual(self.client.get('/items', headers=headers).status_code, 429)
+        self.assertEqual(self.client.get('/items').status_code, 200)
+
+    def test_unlimited_resources_pass(self):
+        app.config['RATELIMIT_LIMITS'] = {}
+        for _ in range(20):
+            self.assertEqual(self.client.get('/stores').status_code, 200)
+
+    def test_busy_worker_sheds_requests(self):
+        app.config['MAX_CONCURRENT_REQUESTS'] = 1
+        limiter.clear()
+        with app.test_request_context('/stores'):
+            app.preprocess_request()  # holds the only slot
+            try:
+                r = self.client.get('/stores')
+                self.assertEqual(r.status_code, 503)
+                self.assertEqual(r.headers['Retry-After'], '1')
+                self.assertEqual(self.client.get('/health').status_code, 200)
+            finally:
+                limiter.finish_request(None)
+        self.assertEqual(self.client.get('/stores').status_code, 200)
+        self.assertIn('admission_rejected_total{resource="StoreList"} 1', self.client.get('/metrics').get_data(as_text=True))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import json
+import unittest
+
+from flask_restful import reqparse
+from werkzeug.exceptions import HTTPException
+
+from app import app
+from schema import Schema
+
+
+def reqparse_parser():
+    parser = reqparse.RequestParser()
+    parser.add_argument('price', type=float, required=True, help="This field cannot be empty")
+    parser.add_argument('store_id', type=int, required=True, help="Store ID cannot be empty")
+    return parser
+
+
+SCHEMA = Schema(
+    ('price', float, "This field cannot be empty"),
+    ('store_id', int, "Store ID cannot be empty"),
+)
+
+REQUESTS = [
+    {'json': {'price': 1.5, 'store_id': 2}},
+    {'json': {'price': '1.5', 'store_id': '2', 'extra': True}},
+    {'json': {'price': 1, 'store_id': 2.9}},
+    {'json': {'price': None, 'store_id': 2}},
+    {'json': {'store_id': 2}},
+    {'json': {'price': 'cheap', 'store_id': 2}},
+    {'json': {'price': 1.5, 'store_id': '2.5'}},
+    {'json': {'price': [1], 'store_id': 2}},
+    {'json': {'price': [1, 'x'], 'store_id': 2}},
+    {'json': {'price': [], 'store_id': 2}},
+    {'json': {'price': {'amount': 1}, 'store_id': 2}},
+    {'json': {}},
+    {'data': {'price': '1.5', 'store_id': '2'}},
+    {'data': {'price': '', 'store_id': '2'}},
+    {'data': {'price': '1.5'}},
+    {'data': {'price': '1.5', 'store_id': ['2', '3']}},
+    {'json': {'price': 1.5}, 'query_string': {'store_id': '3'}},
+    {'json': {'price': 1.5, 'store_id': 2}, 'query_string': {'store_id': '3'}},
+    {},
+]
+
+
+def outcome(parse, kwargs):
+    with app.test_request_context('/item/chair', method='POST', **kwargs):
+        try:
+            return 200, dict(parse())
+        except HTTPException as e:
+            return e.code, getattr(e, 'data', None)
+
+
+class SchemaTests(unittest.TestCase):
+
+    def test_matches_reqparse(self):
+        parser = reqparse_parser()
+        for kwargs in REQUESTS:
+            with self.subTest(**kwargs):
+                self.assertEqual(outcome(SCHEMA.parse, kwargs), outcome(parser.parse_args, kwargs))
+
+    def test_malformed_json_is_rejected(self):
+        with app.test_request_context('/item/chair', method='POST', data='{"price"',
+                                      content_type='application/json'):
+            with self.assertRaises(HTTPException) as raised:
+                SCHEMA.parse()
+        self.assertEqual(raised.exception.code, 400)
+
+    def test_register_accepts_form_and_reports_first_missing_field(self):
+        client = app.test_client()
+        r = client.post('/register', data={'username': 'user1'})
+        self.assertEqual(r.status_code, 400)
+        self.assertEqual(json.loads(r.data), {'message': {'password': 'This field cannot be empty'}})
+
+
+if __name__ == '__main__':
+    unittest.main()
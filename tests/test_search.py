@@ -0,0 +1,83 @@
+import unittest
+from unittest import mock
+
+from db import db
+from models.item import ItemModel
+from models.store import StoreModel
+from tests.base import AppTestCase
+
+
+class SearchTests(AppTestCase):
+
+    def setUp(self):
+        super().setUp()
+        db.session.add_all([StoreModel('store1'), StoreModel('store2')])
+        db.session.add_all([
+            ItemModel('red chair', 20.0, 1),
+            ItemModel('chair', 35.0, 1),
+            ItemModel('office chair deluxe', 120.0, 2),
+            ItemModel('table', 80.0, 2),
+        ])
+        db.session.commit()
+        self.headers = self.register_and_login()
+
+    def search(self, query):
+        r = self.client.get('/items/search?' + query, headers=self.headers)
+        self.assertEqual(r.status_code, 200)
+        return r.get_json()
+
+    def names(self, query):
+        return [item['name'] for item in self.search(query)['items']]
+
+    def test_ranked_prefix_match(self):
+        self.assertTrue(ItemModel.has_fts())
+        self.assertEqual(self.names('q=chair')[0], 'chair')
+        self.assertEqual(sorted(self.names('q=chai')), ['chair', 'office chair deluxe', 'red chair'])
+        self.assertEqual(self.names('q=CHAIR+off'), ['office chair deluxe'])
+        self.assertEqual(self.names('q=sofa'), [])
+
+    def test_filters(self):
+        self.assertEqual(self.names('q=chair&max_price=40&store_id=1'), ['chair', 'red chair'])
+        self.assertEqual(self.names('min_price=30&max_price=100'), ['chair', 'table'])
+        self.assertEqual(self.names('store_id=2'), ['table', 'office chair deluxe'])
+
+    def test_index_follows_writes(self):
+        self.client.put('/item/chair', json={'price': 36.0, 'store_id': 1})
+        self.client.put('/item/stool', json={'price': 15.0, 'store_id': 1})
+        self.assertEqual(self.names('q=stool'), ['stool'])
+
+        item = ItemModel.find_by_name('table')
+        item.name = 'desk'
+        item.upsert()
+        self.assertEqual(self.names('q=table'), [])
+        self.assertEqual(self.names('q=desk'), ['desk'])
+
+        self.client.delete('/item/desk', headers=self.headers)
+        self.assertEqual(self.names('q=desk'), [])
+
+    def test_paginated_by_offset(self):
+        body = self.search('q=chair&limit=2')
+        self.assertEqual(len(body['items']), 2)
+        self.assertEqual(body['next'], 2)
+        body = self.search('q=chair&limit=2&after=2')
+        self.assertEqual(len(body['items']), 1)
+        self.assertNotIn('next', body)
+
+    def test_anonymous_sees_names(self):
+        r = self.client.get('/items/search?q=table')
+        self.assertEqual(r.get_json(), {'item': ['table'], 'message': 'More data available if you log in'})
+
+    def test_bad_filter(self):
+        r = self.client.get('/items/search?min_price=cheap', headers=self.headers)
+        self.assertEqual(r.status_code, 400)
+        self.assertEqual(r.get_json()['message'], {'min_price': 'Minimum price must be a number'})
+
+    def test_like_fallback(self):
+        with mock.patch.object(ItemModel, 'has_fts', return_value=False):
+            self.assertEqual(self.names('q=chair'), ['chair', 'office chair deluxe', 'red chair'])
+            self.assertEqual(self.names('q=chair+DEL&store_id=2'), ['office chair deluxe'])
+            self.assertEqual(self.names('q=50%'), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
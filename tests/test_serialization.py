@@ -0,0 +1,51 @@
+import json
+import unittest
+from unittest import mock
+
+import serialization
+from app import app
+from tests.base import AppTestCase
+
+
+@unittest.skipIf(serialization.orjson is None, 'orjson is not installed')
+class OutputJsonTests(AppTestCase):
+
+    def encode(self, data):
+        with app.test_request_context():
+            return serialization.output_json(data, 200).get_data()
+
+    def test_large_payload_uses_orjson(self):
+        data = {'items': [{'id': i, 'name': 'item{}'.format(i), 'price': i / 7.0, 'store_id': 1} for i in range(60)]}
+        body = self.encode(data)
+        self.assertEqual(body, serialization.orjson.dumps(data) + b'\n')
+        self.assertEqual(json.loads(body), data)
+        self.assertEqual(list(json.loads(body)['items'][0]), ['id', 'name', 'price', 'store_id'])
+
+    def test_small_payload_unchanged(self):
+        self.assertEqual(self.encode({'message': 'ok'}), (json.dumps({'message': 'ok'}) + '\n').encode())
+
+    def test_tiny_floats_keep_stdlib_formatting(self):
+        data = {'items': [{'price': 2.5e-05}] * 60}
+        self.assertEqual(self.encode(data), (json.dumps(data) + '\n').encode())
+
+    def test_non_finite_floats_keep_stdlib_formatting(self):
+        for value in (float('nan'), float('inf'), float('-inf')):
+            data = {'items': [{'price': 1.5}] * 59 + [{'price': value}]}
+            self.assertEqual(self.encode(data), (json.dumps(data) + '\n').encode())
+
+    def test_names_that_look_like_exponents_still_use_orjson(self):
+        data = {'stores': [{'id': i, 'name': 'store-{}'.format(i), 'price': None} for i in range(60)]}
+        with mock.patch.object(serialization, 'stdlib_output_json') as stdlib:
+            self.encode(data)
+        stdlib.assert_not_called()
+
+    def test_large_listing_through_api(self):
+        self.client.post('/items/batch', json=[{'name': 'item{}'.format(i), 'price': 1.25, 'store_id': 1}
+                                               for i in range(60)])
+        r = self.client.get('/items')
+        self.assertEqual(r.content_type, 'application/json')
+        self.assertEqual(len(r.get_json()['item']), 60)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import os
+import tempfile
+import unittest
+
+from flask import Flask
+from sqlalchemy import event
+
+import migrations
+from app import db
+from models.item import ItemModel
+from models.store import StoreModel
+from models.store_stats import StoreStatsModel
+
+
+class StoreSerializationTests(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Creates a throwaway database so the query counts are not affected by other tests
+        """
+        self.db_dir = tempfile.TemporaryDirectory()
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(self.db_dir.name, 'data.db')
+        self.app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(self.app)
+        self.context = self.app.app_context()
+        self.context.push()
+        self.create_schema()
+
+    def create_schema(self):
+        migrations.upgrade(db.engine)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+        self.db_dir.cleanup()
+
+    def populate_db(self, store_count, items_per_store=2):
+        first = StoreModel.query.count()
+        for s in range(first, first + store_count):
+            store = StoreModel('store{}'.format(s))
+            db.session.add(store)
+            db.session.flush()
+            for i in range(items_per_store):
+                db.session.add(ItemModel('item{}-{}'.format(s, i), 1.5 + i, store.id))
+        db.session.commit()
+        db.session.expire_all()
+
+    def count_queries(self, func):
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            result = func()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+        return result, len(statements)
+
+    def test_json_many_matches_json(self):
+        self.populate_db(3)
+        db.session.add(ItemModel('bargain', 0.5, 1))  # cheapest but newest, so price and id order differ
+        db.session.commit()
+        stores = StoreModel.find_all()
+        self.assertEqual(StoreModel.json_many(stores), [store.json() for store in stores])
+
+    def test_json_many_query_count_is_constant(self):
+        self.populate_db(2)
+        _, small = self.count_queries(lambda: StoreModel.json_many(StoreModel.find_all()))
+
+        db.session.expire_all()
+        self.populate_db(50)
+        result, large = self.count_queries(lambda: StoreModel.json_many(StoreModel.find_all()))
+
+        self.assertEqual(len(result), 52)
+        self.assertEqual(small, large)
+        self.assertEqual(large, 2)
+
+    def test_json_many_empty(self):
+        self.assertEqual(StoreModel.json_many([]), [])
+
+    def test_stats(self):
+        self.populate_db(1)
+        self.assertEqual(StoreStatsModel.find_json_by_name('store0'), {
+            'id': 1, 'name': 'store0', 'item_count': 2, 'min_price': 1.5, 'max_price': 2.5, 'avg_price': 2.0})
+
+
+class CreateAllStoreSerializationTests(StoreSerializationTests):
+    """
+    The same against a schema from db.create_all(), which has no migration indexes or store_stats triggers
+    """
+
+    def create_schema(self):
+        db.create_all()
+
+
+if __name__ == '__main__':
+    unittest.main()
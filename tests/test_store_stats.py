@@ -0,0 +1,72 @@
+import unittest
+from unittest import mock
+
+from app import app
+from db import db
+from models.item import ItemModel
+from models.store import StoreModel
+from models.store_stats import StoreStatsModel, store_stats
+from tests.base import AppTestCase
+
+
+class StoreStatsTests(AppTestCase):
+
+    def setUp(self):
+        super().setUp()
+        db.session.add_all([StoreModel('store1'), StoreModel('store2'), StoreModel('empty')])
+        db.session.add_all([ItemModel('chair', 10.0, 1), ItemModel('desk', 30.0, 1), ItemModel('lamp', 5.0, 2)])
+        db.session.commit()
+
+    def stats(self, name):
+        r = self.client.get('/store/{}/stats'.format(name))
+        self.assertEqual(r.status_code, 200)
+        return r.get_json()
+
+    def test_store_stats(self):
+        self.assertTrue(StoreStatsModel.has_table())
+        self.assertEqual(self.stats('store1'), {'id': 1, 'name': 'store1', 'item_count': 2, 'min_price': 10.0,
+                                                'max_price': 30.0, 'avg_price': 20.0})
+        self.assertEqual(self.stats('empty'), {'id': 3, 'name': 'empty', 'item_count': 0, 'min_price': None,
+                                               'max_price': None, 'avg_price': None})
+        self.assertEqual(self.client.get('/store/nowhere/stats').status_code, 404)
+
+    def test_write_paths_keep_stats_current(self):
+        self.client.put('/item/chair', json={'price': 40.0, 'store_id': 1})
+        self.assertEqual((self.stats('store1')['min_price'], self.stats('store1')['max_price']), (30.0, 40.0))
+
+        self.client.put('/item/desk', json={'price': 30.0, 'store_id': 2})  # moves to another store
+        self.assertEqual(self.stats('store1')['item_count'], 1)
+        self.assertEqual(self.stats('store2'), {'id': 2, 'name': 'store2', 'item_count': 2, 'min_price': 5.0,
+                                                'max_price': 30.0, 'avg_price': 17.5})
+
+        self.client.post('/items/batch', json=[{'name': 'rug', 'price': 1.0, 'store_id': 3}])
+        headers = self.register_and_login()
+        self.client.delete('/item/chair', headers=headers)
+        self.assertEqual(self.stats('store1')['item_count'], 0)
+        self.assertEqual(self.stats('empty')['avg_price'], 1.0)
+        self.assertEqual(StoreStatsModel.rebuild(), 0)
+
+    def test_stores_stats_page(self):
+        r = self.client.get('/stores/stats?limit=2')
+        body = r.get_json()
+        self.assertEqual([store['item_count'] for store in body['stores']], [2, 1])
+        self.assertEqual(body['next'], 2)
+
+    def test_rebuild_repairs_drift(self):
+        db.session.execute(store_stats.update().values(item_count=99))
+        db.session.commit()
+        self.assertEqual(StoreStatsModel.rebuild(), 2)
+        self.assertEqual(self.stats('store1')['item_count'], 2)
+
+        result = app.test_cli_runner().invoke(args=['rebuild-store-stats'])
+        self.assertIn('0 store(s) were out of date', result.output)
+
+    def test_aggregate_fallback(self):
+        with mock.patch.object(StoreStatsModel, 'has_table', return_value=False):
+            self.assertEqual(self.stats('store1')['avg_price'], 20.0)
+            self.assertEqual(self.stats('empty')['item_count'], 0)
+            self.assertEqual(StoreStatsModel.rebuild(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import time
+import unittest
+from datetime import timedelta
+
+from flask_jwt_extended import create_access_token
+
+from app import app
+from token_cache import TokenCache, token_cache
+from tests.base import AppTestCase
+
+
+class TokenCacheTests(AppTestCase):
+
+    def test_repeated_token_is_verified_once(self):
+        headers = self.register_and_login()
+        for _ in range(3):
+            self.assertEqual(self.client.get('/item/chair', headers=headers).status_code, 404)
+        self.assertEqual(token_cache.misses, 1)
+        self.assertEqual(token_cache.hits, 2)
+
+    def test_logout_revokes_cached_token(self):
+        headers = self.register_and_login()
+        self.client.get('/item/chair', headers=headers)
+        self.client.post('/logout', headers=headers)
+        self.assertEqual(len(token_cache), 0)
+
+        r = self.client.get('/item/chair', headers=headers)
+        self.assertEqual(r.status_code, 401)
+        self.assertEqual(r.get_json()['error'], 'token_revoked')
+
+    def test_expired_token_is_not_served(self):
+        with app.test_request_context():
+            token = create_access_token(identity=1, expires_delta=timedelta(seconds=1))
+        headers = {'Authorization': 'Bearer {}'.format(token)}
+        self.assertEqual(self.client.get('/item/chair', headers=headers).status_code, 404)
+
+        time.sleep(2.1)  # PyJWT compares whole seconds
+        r = self.client.get('/item/chair', headers=headers)
+        self.assertEqual(r.status_code, 401)
+        self.assertEqual(r.get_json()['error'], 'token_expired')
+
+    def test_tampered_token_is_not_cached(self):
+        headers = self.register_and_login()
+        headers['Authorization'] = headers['Authorization'][:-2] + 'xx'
+        for _ in range(2):
+            self.assertEqual(self.client.get('/item/chair', headers=headers).status_code, 401)
+        self.assertEqual(len(token_cache), 0)
+
+    def test_bounded(self):
+        cache = TokenCache(max_entries=2)
+        with app.test_request_context():
+            for identity in range(3):
+                cache.decode_token(create_access_token(identity=identity))
+        self.assertEqual(len(cache), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
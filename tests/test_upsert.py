@@ -0,0 +1,94 @@
+import threading
+import unittest
+from unittest import mock
+
+from app import app
+from db import db
+from models import item as item_module
+from models.item import ItemModel
+from models.user import UserModel
+from tests.base import AppTestCase
+
+
+class UpsertTests(AppTestCase):
+    THREADS = 8
+    REQUESTS_PER_THREAD = 15
+
+    def hammer(self, method, url, payload):
+        statuses = []
+        barrier = threading.Barrier(self.THREADS)
+
+        def worker(thread):
+            client = app.test_client()
+            barrier.wait()
+            for i in range(self.REQUESTS_PER_THREAD):
+                r = getattr(client, method)(url, json=payload(thread, i))
+                statuses.append(r.status_code)
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return statuses
+
+    def test_put_item_returns_row(self):
+        r = self.client.put('/item/chair', json={'price': 9.99, 'store_id': 1})
+        self.assertEqual(r.get_json(), {'id': 1, 'name': 'chair', 'price': 9.99, 'store_id': 1})
+
+        r = self.client.put('/item/chair', json={'price': 5, 'store_id': 2})
+        self.assertEqual(r.get_json(), {'id': 1, 'name': 'chair', 'price': 5.0, 'store_id': 2})
+        self.assertIsInstance(r.get_json()['price'], float)  # SQLite's RETURNING gives back 5.0 as 5
+
+        r = self.client.put('/item/table', json={'price': 7, 'store_id': 2})
+        self.assertIsInstance(r.get_json()['price'], float)
+
+    def test_put_item_deleted_between_insert_and_update(self):
+        self.client.put('/item/chair', json={'price': 9.99, 'store_id': 1})
+        execute = db.session.execute
+        deleted = []
+
+        def delete_before_update(statement, *args, **kwargs):
+            if statement is item_module.UPDATE_BY_NAME and not deleted:
+                deleted.append(execute(ItemModel.__table__.delete()))  # as a concurrent DELETE would
+            return execute(statement, *args, **kwargs)
+
+        with mock.patch.object(db.session, 'execute', side_effect=delete_before_update):
+            r = self.client.put('/item/chair', json={'price': 5.0, 'store_id': 1})
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.get_json(), ItemModel.find_by_name('chair').json())  # inserted again
+
+    def test_concurrent_puts_for_one_item(self):
+        statuses = self.hammer('put', '/item/chair', lambda thread, i: {'price': thread + i / 100, 'store_id': thread})
+
+        self.assertEqual(set(statuses), {200})
+        self.assertEqual(len(ItemModel.find_all()), 1)
+
+    def test_put_user(self):
+        self.client.post('/register', json={'username': 'user1', 'password': 'abc'})
+
+        r = self.client.put('/user/1', json={'username': 'user1', 'password': 'qrs'})
+        self.assertEqual(r.get_json(), {'id': 1, 'username': 'user1'})
+        self.assertEqual(UserModel.find_by_id(1).password, 'qrs')
+
+        r = self.client.put('/user/9', json={'username': 'user9', 'password': 'xxx'})
+        self.assertEqual(r.get_json(), {'id': 2, 'username': 'user9'})
+
+    def test_put_user_cannot_take_another_users_name(self):
+        self.client.post('/register', json={'username': 'user1', 'password': 'abc'})
+
+        r = self.client.put('/user/9', json={'username': 'user1', 'password': 'qrs'})
+        self.assertEqual(r.status_code, 409)
+        self.assertEqual(UserModel.find_by_id(1).password, 'abc')
+
+    def test_concurrent_puts_for_one_new_user(self):
+        statuses = self.hammer('put', '/user/9', lambda thread, i: {'username': 'user9', 'password': str(thread)})
+
+        # one creates user9 with the next free id, every other finds the name taken by that id
+        self.assertEqual(sorted(set(statuses)), [200, 409])
+        self.assertEqual(statuses.count(200), 1)
+        self.assertEqual(UserModel.query.count(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+"""
+Cache of verified JWT claims, keyed by a hash of the raw token.
+
+Clients reuse one access token for many requests, and every one of them used to re-verify the
+HMAC signature and re-parse the claims. install() swaps the decode step flask_jwt_extended's view
+decorators use for one that remembers the verified claims until the token's own exp. The library
+still runs its type and blocklist checks on every request, so a token revoked by any worker is
+refused as soon as that worker's blocklist has synced; revoke() drops a logged-out token at once.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from flask_jwt_extended import utils, view_decorators
+
+MAX_ENTRIES = 10000
+
+
+class TokenCache:
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._claims = OrderedDict()  # token hash -> (claims, exp)
+        self._by_jti = {}  # jti -> token hash
+        self._lock = threading.Lock()
+
+    def decode_token(self, encoded_token, csrf_value=None, allow_expired=False):
+        if csrf_value is not None or allow_expired:
+            return utils.decode_token(encoded_token, csrf_value, allow_expired)
+
+        key = hashlib.sha256(encoded_token.encode() if isinstance(encoded_token, str) else encoded_token).digest()
+        with self._lock:
+            entry = self._claims.get(key)
+            if entry is not None:
+                if entry[1] is None or entry[1] > time.time():
+                    self._claims.move_to_end(key)
+                    self.hits += 1
+                    return dict(entry[0])
+                self._remove(key)
+            self.misses += 1
+
+        claims = utils.decode_token(encoded_token)  # raises for bad signatures and expired tokens, which are never cached
+        with self._lock:
+            self._claims[key] = (claims, claims.get('exp'))
+            if 'jti' in claims:
+                self._by_jti[claims['jti']] = key
+            while len(self._claims) > self.max_entries:
+                self._remove(next(iter(self._claims)))
+        return dict(claims)
+
+    def revoke(self, jti):
+        with self._lock:
+            key = self._by_jti.get(jti)
+            if key is not None:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._claims.clear()
+            self._by_jti.clear()
+            self.hits = self.misses = 0
+
+    def __len__(self):
+        return len(self._claims)
+
+    def _remove(self, key):
+        claims, _ = self._claims.pop(key)
+        self._by_jti.pop(claims.get('jti'), None)
+
+
+token_cache = TokenCache()
+
+
+def install():
+    view_decorators.decode_token = token_cache.decode_token